@@ -0,0 +1,285 @@
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from geo_utils import pixels_to_wgs84
+
+# Spaltenreihenfolge aller Bulk-Exporte
+COLUMNS = ("nr", "x", "y", "laengengrad", "breitengrad", "hoehe", "prominenz", "dominanz_m", "oro_dominanz")
+
+
+def peaks_to_columns(peaks, dem_data, geo_transform, crs_system, pixel_per_meter=None):
+    """
+    Wandelt das Ergebnis von find_peaks in spaltenweise numpy-Arrays um.
+    Die WGS84-Koordinaten werden in einem vektorisierten Durchlauf berechnet.
+    :param peaks: Liste [(x, y), Höhe, Prominenz, Dominanz (px)] aus find_peaks
+    :param dem_data: 2D-Array der Höhenwerte
+    :param geo_transform: Affine-Transform des Rasters
+    :param crs_system: Koordinatensystem des Rasters
+    :param pixel_per_meter: (x, y) Pixel pro Meter; ohne Angabe bleibt die Dominanz in Metern NaN
+    :return: Dict {Spaltenname: Array}
+    """
+    n = len(peaks)
+    xy = np.array([p[0] for p in peaks], dtype=np.int32).reshape(n, 2)
+    x, y = xy[:, 0], xy[:, 1]
+    prominence = np.fromiter((p[2] for p in peaks), dtype=np.float64, count=n)
+    dominance_px = np.fromiter((p[3] for p in peaks), dtype=np.float64, count=n)
+    height = dem_data[y, x].astype(np.float64)
+
+    long, lat = pixels_to_wgs84(x, y, geo_transform, crs_system)
+    if pixel_per_meter:
+        dominance_m = dominance_px / pixel_per_meter[1]
+    else:
+        dominance_m = np.full(n, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        orographic = np.where(height != 0, prominence / height * 100, 0.0)
+
+    return {
+        "nr": np.arange(1, n + 1, dtype=np.int32),
+        "x": x,
+        "y": y,
+        "laengengrad": long,
+        "breitengrad": lat,
+        "hoehe": height,
+        "prominenz": prominence,
+        "dominanz_m": dominance_m,
+        "oro_dominanz": orographic,
+    }
+
+
+def export_geojson(path, columns, chunk_size=50000):
+    """
+    Schreibt die Gipfel als GeoJSON-FeatureCollection (Punkte in WGS84).
+    Pro Block wird ein einziger Format-String auf die flach gelegten Spalten angewendet,
+    es entstehen also keine Zeilen-Strings. Nicht-endliche Werte (z.B. Dominanz des höchsten Gipfels) werden null;
+    Gipfel ohne gültige WGS84-Koordinaten bekommen "geometry":null (ungültige Punkte sind in GeoJSON nicht erlaubt).
+    """
+    properties = '"properties":{"nr":%d,"x":%d,"y":%d,"hoehe":%s,"prominenz":%s,"dominanz_m":%s,"oro_dominanz":%s}}'
+    point_feature = '{"type":"Feature","geometry":{"type":"Point","coordinates":[%s,%s]},' + properties
+    null_feature = '{"type":"Feature","geometry":null,' + properties
+    # (Spalte, Nachkommastellen; None = Ganzzahl)
+    order = (("laengengrad", 8), ("breitengrad", 8), ("nr", None), ("x", None), ("y", None),
+             ("hoehe", 2), ("prominenz", 2), ("dominanz_m", 2), ("oro_dominanz", 2))
+    n = len(columns["nr"])
+    no_geometry = ~(np.isfinite(columns["laengengrad"]) & np.isfinite(columns["breitengrad"]))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"type":"FeatureCollection","features":[\n')
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            block = np.empty((stop - start, len(order)), dtype=object)
+            for i, (name, decimals) in enumerate(order):
+                values = columns[name][start:stop]
+                if decimals is None:
+                    block[:, i] = values
+                    continue
+                block[:, i] = np.round(values, decimals)
+                non_finite = ~np.isfinite(values)
+                if non_finite.any():
+                    block[non_finite, i] = "null"
+            if start:
+                f.write(",\n")
+            missing = no_geometry[start:stop]
+            if not missing.any():
+                f.write(",\n".join([point_feature] * (stop - start)) % tuple(block.ravel()))
+                continue
+            # Ohne Geometrie entfallen die beiden Koordinaten-Werte der Zeile
+            keep = np.ones(block.shape, dtype=bool)
+            keep[missing, :2] = False
+            features = np.where(missing, null_feature, point_feature)
+            f.write(",\n".join(features.tolist()) % tuple(block[keep]))
+        f.write("\n]}\n")
+
+
+def _gpkg_point_blobs(long, lat, srs_id=4326):
+    """
+    Baut die GeoPackage-Geometrie-Blobs (GP-Header + WKB-Punkt) für alle Punkte auf einmal.
+    Punkte ohne gültige WGS84-Koordinaten bekommen None (NULL-Geometrie), wie "geometry":null in export_geojson.
+    """
+    blob_dtype = np.dtype([("magic", "S2"), ("version", "u1"), ("flags", "u1"), ("srs_id", "<i4"),
+                           ("byte_order", "u1"), ("wkb_type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+    blobs = np.empty(len(long), dtype=blob_dtype)
+    blobs["magic"] = b"GP"
+    blobs["version"] = 0
+    blobs["flags"] = 1  # little endian, keine Envelope
+    blobs["srs_id"] = srs_id
+    blobs["byte_order"] = 1
+    blobs["wkb_type"] = 1  # Point
+    blobs["x"] = long
+    blobs["y"] = lat
+    buffer = memoryview(blobs.tobytes())
+    size = blob_dtype.itemsize
+    finite = (np.isfinite(long) & np.isfinite(lat)).tolist()
+    return (buffer[i * size:(i + 1) * size] if finite[i] else None for i in range(len(long)))
+
+
+def export_geopackage(path, columns, table="gipfel", spatial_index=False):
+    """
+    Schreibt die Gipfel als GeoPackage (SQLite) mit Punkt-Geometrie in WGS84, optional mit R*Tree-Index.
+    Die Zeilen werden direkt aus den Spalten-Arrays per executemany gestreamt.
+    :param spatial_index: R*Tree anlegen. Standardmäßig aus: der Index kostet bei SQLite ca. 15 µs pro Gipfel,
+                          mit ihm dauert der Export von 100k Gipfeln rund 1.5 s statt deutlich unter einer Sekunde
+    """
+    n = len(columns["nr"])
+    long, lat = columns["laengengrad"], columns["breitengrad"]
+    finite = np.isfinite(long) & np.isfinite(lat)
+    bbox = (float(long[finite].min()), float(lat[finite].min()),
+            float(long[finite].max()), float(lat[finite].max())) if finite.any() else (None,) * 4
+
+    con = sqlite3.connect(path)
+    try:
+        cur = con.cursor()
+        cur.execute("PRAGMA application_id = 1196444487")  # 'GPKG'
+        cur.execute("PRAGMA user_version = 10300")
+        # Export schreibt eine neue Datei am Stück -> kein Journal/fsync nötig
+        cur.execute("PRAGMA journal_mode = MEMORY")
+        cur.execute("PRAGMA synchronous = OFF")
+        cur.executescript("""
+            CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+            CREATE TABLE IF NOT EXISTS gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '', last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER);
+            CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name));
+            CREATE TABLE IF NOT EXISTS gpkg_extensions (
+                table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL,
+                definition TEXT NOT NULL, scope TEXT NOT NULL);
+        """)
+        cur.executemany("INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+            ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+            ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+            ("WGS 84 geodetic", 4326, "EPSG", 4326,
+             'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],'
+             'PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]', None),
+        ])
+
+        cur.execute(f'DROP TABLE IF EXISTS "{table}"')
+        cur.execute(f'DROP TABLE IF EXISTS "rtree_{table}_geom"')
+        cur.execute(f'''CREATE TABLE "{table}" (
+            fid INTEGER PRIMARY KEY, geom POINT, nr INTEGER, x INTEGER, y INTEGER,
+            laengengrad DOUBLE, breitengrad DOUBLE, hoehe DOUBLE, prominenz DOUBLE, dominanz_m DOUBLE, oro_dominanz DOUBLE)''')
+        cur.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (table,))
+        cur.execute("DELETE FROM gpkg_geometry_columns WHERE table_name = ?", (table,))
+        cur.execute("DELETE FROM gpkg_extensions WHERE table_name = ?", (table,))
+        cur.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, min_x, min_y, max_x, max_y, srs_id) "
+                    "VALUES (?, 'features', ?, ?, ?, ?, ?, 4326)", (table, table, *bbox))
+        cur.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'POINT', 4326, 0, 0)", (table,))
+
+        # NaN wird von sqlite3 als NULL gespeichert
+        values = [columns[name].tolist() for name in COLUMNS]
+        rows = zip(range(1, n + 1), _gpkg_point_blobs(long, lat), *values)
+        cur.executemany(f'INSERT INTO "{table}" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+        # Räumlicher Index (GeoPackage RTree Spatial Index Extension)
+        if spatial_index:
+            cur.execute(f'CREATE VIRTUAL TABLE "rtree_{table}_geom" USING rtree(id, minx, maxx, miny, maxy)')
+            cur.execute(f'INSERT INTO "rtree_{table}_geom" SELECT fid, laengengrad, laengengrad, breitengrad, breitengrad '
+                        f'FROM "{table}" WHERE laengengrad BETWEEN -180 AND 180 AND breitengrad BETWEEN -90 AND 90')
+            cur.execute("INSERT INTO gpkg_extensions VALUES (?, 'geom', 'gpkg_rtree_index', "
+                        "'http://www.geopackage.org/spec120/#extension_rtree', 'write-only')", (table,))
+        con.commit()
+    finally:
+        con.close()
+
+
+def export_parquet(path, columns):
+    """
+    Schreibt die Gipfel als Parquet-Datei. Die numpy-Spalten werden ohne Kopie an Arrow übergeben.
+    Benötigt das optionale Paket pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Für den Parquet-Export wird pyarrow benötigt (pip install pyarrow)") from e
+
+    table = pa.table({name: columns[name] for name in COLUMNS})
+    pq.write_table(table, path)
+
+
+def export_peaks(path, peaks, dem_data, geo_transform, crs_system, pixel_per_meter=None, spatial_index=True):
+    """
+    Exportiert die Gipfel abhängig von der Dateiendung als GeoJSON (.geojson/.json),
+    GeoPackage (.gpkg/.sqlite) oder Parquet (.parquet).
+    :param spatial_index: R*Tree-Index im GeoPackage anlegen (Standard: an; bei den Gipfelzahlen eines DEMs kostet
+                          er nur Millisekunden, erst bei Bulk-Exporten mit export_geopackage lohnt es sich, ihn wegzulassen)
+    """
+    exporters = {
+        ".geojson": export_geojson,
+        ".json": export_geojson,
+        ".gpkg": export_geopackage,
+        ".sqlite": export_geopackage,
+        ".parquet": export_parquet,
+    }
+    suffix = path[path.rfind("."):].lower() if "." in path else ""
+    if suffix not in exporters:
+        raise ValueError(f"Unbekanntes Exportformat: '{suffix}'")
+
+    columns = peaks_to_columns(peaks, dem_data, geo_transform, crs_system, pixel_per_meter)
+    if exporters[suffix] is export_geopackage:
+        export_geopackage(path, columns, spatial_index=spatial_index)
+    else:
+        exporters[suffix](path, columns)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from rasterio.transform import from_origin
+
+    n_peaks = 100_000
+    print(f"--- Geschwindigkeitstest Bulk-Export ({n_peaks} Gipfel) ---")
+    rng = np.random.default_rng(0)
+    test_dem = rng.integers(0, 4800, (2000, 2000), dtype=np.int16)
+    xs = rng.integers(0, 2000, n_peaks)
+    ys = rng.integers(0, 2000, n_peaks)
+    test_peaks = [((int(x), int(y)), int(test_dem[y, x]), int(test_dem[y, x]) // 3, float(d))
+                  for x, y, d in zip(xs, ys, rng.uniform(1, 500, n_peaks))]
+    test_peaks[0] = (test_peaks[0][0], test_peaks[0][1], test_peaks[0][2], np.inf)
+    transform = from_origin(2600000, 1200000, 10, 10)
+
+    start_time = time.time()
+    test_columns = peaks_to_columns(test_peaks, test_dem, transform, "EPSG:2056", (0.1, 0.1))
+    print(f"  Spalten + WGS84: {time.time() - start_time:.3f} Sekunden")
+    test_columns["laengengrad"][1] = np.inf  # fehlgeschlagene Transformation
+
+    def export_geopackage_indexed(path, columns):
+        export_geopackage(path, columns, spatial_index=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, export in (("gipfel.geojson", export_geojson), ("gipfel.gpkg", export_geopackage),
+                             ("gipfel_index.gpkg", export_geopackage_indexed), ("gipfel.parquet", export_parquet)):
+            out_path = os.path.join(tmp, name)
+            start_time = time.time()
+            try:
+                export(out_path, test_columns)
+            except ImportError as e:
+                print(f"  {name}: übersprungen ({e})")
+                continue
+            print(f"  {name}: {time.time() - start_time:.3f} Sekunden, {os.path.getsize(out_path) / 1e6:.1f} MB")
+
+        with open(os.path.join(tmp, "gipfel.geojson"), encoding="utf-8") as f:
+            features = json.load(f)["features"]
+        assert len(features) == n_peaks
+        assert features[1]["geometry"] is None and features[1]["properties"]["nr"] == 2
+        assert features[2]["geometry"]["coordinates"] == [round(test_columns["laengengrad"][2], 8),
+                                                          round(test_columns["breitengrad"][2], 8)]
+        con = sqlite3.connect(os.path.join(tmp, "gipfel_index.gpkg"))
+        assert con.execute("SELECT COUNT(*) FROM rtree_gipfel_geom").fetchone()[0] == n_peaks - 1
+        assert con.execute("SELECT fid FROM gipfel WHERE geom IS NULL").fetchall() == [(2,)]
+        con.close()
+
+        # export_peaks (GUI) legt den räumlichen Index standardmäßig an
+        out_path = os.path.join(tmp, "gui.gpkg")
+        export_peaks(out_path, test_peaks[:100], test_dem, transform, "EPSG:2056", (0.1, 0.1))
+        con = sqlite3.connect(out_path)
+        assert con.execute("SELECT COUNT(*) FROM rtree_gipfel_geom").fetchone()[0] == 100
+        con.close()
+        print("  GeoPackage: NULL-Geometrie und räumlicher Index geprüft")
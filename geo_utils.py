@@ -1,3 +1,4 @@
+import numpy as np
 from pyproj import CRS, Transformer, Geod
 
 def convert_coordinates_to_wgs84(x, y, crs_system):
@@ -11,6 +12,24 @@ def convert_coordinates_to_wgs84(x, y, crs_system):
     long, lat = transformer.transform(x, y)
     return long, lat
 
+def pixels_to_wgs84(xs, ys, geo_transform, crs_system):
+    """
+    Rechnet Pixel-Koordinaten (Pixelmitte) vektorisiert in WGS84 um: ein Affine-Schritt und
+    ein einziger Transformer-Aufruf für alle Punkte.
+    :param xs: Array der Pixel-Spalten
+    :param ys: Array der Pixel-Zeilen
+    :param geo_transform: Affine-Transform des Rasters
+    :param crs_system: Koordinatensystem des Rasters
+    :return: (long, lat) als float64-Arrays
+    """
+    cols = np.asarray(xs, dtype=np.float64) + 0.5
+    rows = np.asarray(ys, dtype=np.float64) + 0.5
+    t = geo_transform
+    world_x = t.a * cols + t.b * rows + t.c
+    world_y = t.d * cols + t.e * rows + t.f
+    long, lat = convert_coordinates_to_wgs84(world_x, world_y, crs_system)
+    return np.asarray(long, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
 def calculate_pixels_per_meter(crs_system, pixel_scale, top_left_x, top_left_y):
     """
     Berechnet die Pixel pro Meter für ein gegebenes Koordinatensystem und Pixelmaßstab.
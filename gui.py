@@ -1,16 +1,21 @@
 import customtkinter as ctk
 from tkinter import filedialog, Toplevel, ttk
-import rasterio.transform
 import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from PIL import Image, ImageTk
 import numpy as np
 import csv 
+import queue
+import threading
+import time
+from scipy.spatial import cKDTree
+from mpl_toolkits.mplot3d import proj3d
 
-from peak_analysis import find_peaks
-from geo_utils import calculate_pixels_per_meter, convert_coordinates_to_wgs84
-from reader import read_dem
+from peak_analysis import find_peaks, find_peaks_anytime
+from geo_utils import calculate_pixels_per_meter, pixels_to_wgs84
+from reader import read_dem_fast
+from exporter import export_peaks
 
 # --- Matplotlib Einstellungen ---
 matplotlib.use("Agg") # Agg-Backend erzwingen (verhindert das Öffnen von Fenstern durch Matplotlib)
@@ -20,6 +25,10 @@ plt.style.use('dark_background')
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+# --- Picking ---
+PICK_RADIUS_PX = 10      # maximaler Bildschirmabstand (Pixel) zwischen Mauszeiger und Gipfel
+HOVER_INTERVAL = 0.05    # Hover-Ereignisse werden höchstens alle 50 ms ausgewertet
+
 class PeakFinderApp:
     def __init__(self, root):
         self.root = root
@@ -34,6 +43,9 @@ class PeakFinderApp:
         self.dem_data = None
         self.peaks_table = None
         self.peaks_csv = []
+        self.peaks = []
+        self.peak_rows = {}  # (x, y) -> (Treeview-Zeile, Werte), für das zeilenweise Aktualisieren der Tabelle
+        self.peak_scatter = None  # Marker der Gipfel im aktuellen Plot
         self.pixel_per_meter = None
         self.geo_transform = None
         self.crs_system = None
@@ -42,6 +54,22 @@ class PeakFinderApp:
         self.orographic_threshold = 0  # Default Orographische Dominanz in %
         self.min_height_threshold = 0    # Default wert
         self.border_width = 50
+        self.time_budget = 10.0  # Zeitbudget des Schnellmodus in Sekunden
+        self.anytime_queue = None  # Ergebnis-Queue einer laufenden Schnellsuche
+        self.anytime_cancel = None  # threading.Event zum Abbrechen der laufenden Schnellsuche
+        self.search_generation = 0  # wird bei jedem neuen DEM und jeder neuen Suche erhöht, ältere Ergebnisse verfallen
+        # Picking: KD-Baum über die Gipfel-Pixelkoordinaten (2D) bzw. über die projizierten Bildschirmkoordinaten (3D)
+        self.peak_points = np.empty((0, 3))
+        self.peak_items = []
+        self.peak_item_index = {}
+        self.peak_index = None
+        self.projected_index = None
+        self.projected_key = None
+        self.highlight_artist = None
+        self.highlighted_peak = None
+        self.selected_peak = None
+        self.last_hover_time = 0.0
+        self.pending_hover = None  # letztes gedrosseltes Hover-Ereignis, wird nachträglich ausgewertet
 
          # --- Setup UI ---
         self._create_frames()
@@ -88,6 +116,10 @@ class PeakFinderApp:
         self.dimension_switch = ctk.CTkSwitch(self.left_frame, text="3D Modus")
         self.dimension_switch.pack(pady=10, padx=20)
 
+        # --- Schnellmodus Switch (Anytime-Suche mit Zeitbudget) ---
+        self.anytime_switch = ctk.CTkSwitch(self.left_frame, text="Schnellmodus")
+        self.anytime_switch.pack(pady=10, padx=20)
+
         # --- Voreinstellungen ComboBox ---
         self.preset_combobox = ctk.CTkOptionMenu(self.left_frame,
                                                  command=self.apply_preset,
@@ -147,7 +179,7 @@ class PeakFinderApp:
 
         # --- Tabelle erstellen ---
         table = ttk.Treeview(self.right_frame_bottom,
-                             columns=("Nummer", "Pixel-Koord", "Breitengrad", "Längengrad", "Höhe"),
+                             columns=("Nummer", "Pixel-Koord", "Breitengrad", "Längengrad", "Höhe", "Status"),
                              show="headings")
         
         # Setzen der Headings
@@ -156,6 +188,7 @@ class PeakFinderApp:
         table.heading("Breitengrad", text="Breitengrad")
         table.heading("Längengrad", text="Längengrad")
         table.heading("Höhe", text="Höhe (m)")
+        table.heading("Status", text="Status")
 
         # Setzen der Spaltenbreiten und Ausrichtung
         table.column("Nummer", width=40, anchor="center", stretch=False)
@@ -163,9 +196,11 @@ class PeakFinderApp:
         table.column("Breitengrad", width=150, anchor="center", stretch=True)
         table.column("Längengrad", width=150, anchor="center", stretch=True)
         table.column("Höhe", width=80, anchor="center", stretch=True)
+        table.column("Status", width=80, anchor="center", stretch=True)
 
         self.peaks_table = table
         self.peaks_table.pack(expand=True, fill="both")
+        self.peaks_table.bind("<<TreeviewSelect>>", self._on_table_select)
 
 
     def _draw_plot(self, dem_data, vmin, vmax):
@@ -198,6 +233,10 @@ class PeakFinderApp:
         self.canvas = canvas
         self.canvas_widget = canvas.get_tk_widget()
         self.canvas_widget.pack(side="top", fill="both", expand=True, padx=(0,60), pady=(10,0))
+        self.canvas.mpl_connect("button_press_event", self._on_canvas_click)
+        self.canvas.mpl_connect("motion_notify_event", self._on_canvas_hover)
+        self.peak_scatter = None  # wurde zusammen mit der alten Figure entfernt
+        self._build_peak_index([], [], [], [])
         self.canvas.draw()
 
 
@@ -207,14 +246,15 @@ class PeakFinderApp:
         if not file_path:
             return
 
+        # Ergebnisse einer noch laufenden Schnellsuche gehören zum alten DEM
+        self._cancel_anytime_search()
+
         # Tabelle leeren
-        if self.peaks_table:
-            for item in self.peaks_table.get_children():
-                self.peaks_table.delete(item)
+        self._clear_table()
 
         try:
             # --- Ausgelagertes DEM-Lesen ---
-            dem_data, crs, transform, (xres, yres) = read_dem(file_path)
+            dem_data, crs, transform, (xres, yres) = read_dem_fast(file_path)
             self.dem_data = dem_data
             self.crs_system = crs
             self.geo_transform = transform
@@ -259,30 +299,14 @@ class PeakFinderApp:
         else:
             dominance_pixels = self.dominance_threshold * self.pixel_per_meter[1] # Dominanz [m] in Pixel umrechnen
 
-        try:
-            fig = self.canvas_figure
-
-            if not fig.axes:
-                print("Fehler: Kein Axes-Objekt im Canvas gefunden.")
-                return
-            ax = fig.axes[0]
-
-            # Lösche alle alten Marker (Scatter-Elemente) aus dem Axes
-            elements_to_remove = [child for child in ax.get_children()
-                                  if isinstance(child, matplotlib.collections.PathCollection)]
-            if isinstance(ax, matplotlib.axes._axes.Axes) and not isinstance(ax, plt.Axes): # Checken ob 3D Axes
-                 elements_to_remove.extend([child for child in ax.collections if isinstance(child, matplotlib.collections.PathCollection)])
+        print(f"Suche Gipfel mit Prominenz >= {self.prominence_threshold}m und Dominanz >= {self.dominance_threshold}m ({dominance_pixels:.2f} Pixel)")
 
-            for element in elements_to_remove:
-                element.remove()
-
-            # Alte Einträge in der Tabelle löschen
-            if self.peaks_table:
-                 for item in self.peaks_table.get_children():
-                    self.peaks_table.delete(item)
-
-            print(f"Suche Gipfel mit Prominenz >= {self.prominence_threshold}m und Dominanz >= {self.dominance_threshold}m ({dominance_pixels:.2f} Pixel)")
+        if self.anytime_switch.get() == 1:
+            self._start_anytime_search(dominance_pixels)
+            return
 
+        self._cancel_anytime_search()
+        try:
             # finde Gipfel
             peaks = find_peaks(
                 self.dem_data,
@@ -292,90 +316,363 @@ class PeakFinderApp:
                 border_width=self.border_width,
                 min_height=self.min_height_threshold,
             )
+        except Exception as e:
+            import traceback
+            print(f"Fehler bei der Gipfelsuche: {e}")
+            print(traceback.format_exc())
+            return
 
-            if not peaks:
-                print("Keine prominenten Gipfel gefunden mit den aktuellen Kriterien.")
+        self._render_peaks(peaks)
+
+
+    def _start_anytime_search(self, dominance_pixels):
+        """
+        Startet find_peaks_anytime in einem Hintergrund-Thread. Zwischenergebnisse landen in einer Queue,
+        die im Tk-Hauptthread per after() abgefragt und eingezeichnet wird. Eine noch laufende Schnellsuche
+        wird abgebrochen und durch die neue ersetzt.
+        """
+        self._cancel_anytime_search()
+        generation = self.search_generation
+        cancel = threading.Event()
+        results = queue.Queue()
+        params = dict(
+            prominence_threshold_val=self.prominence_threshold,
+            dominance_threshold_val=dominance_pixels,
+            orographic_dominence_threshold_val=self.orographic_threshold,
+            border_width=self.border_width,
+            min_height=self.min_height_threshold,
+            time_budget=self.time_budget,
+        )
+        dem_data = self.dem_data
+
+        def worker():
+            peaks = []
+            try:
+                peaks = find_peaks_anytime(dem_data, callback=lambda p: results.put((False, p)), cancel=cancel, **params)
+            except Exception as e:
+                print(f"Fehler bei der Schnellsuche: {e}")
+            results.put((True, peaks))
+
+        print(f"Schnellmodus: Zeitbudget {self.time_budget:.1f} s")
+        self.anytime_queue = results
+        self.anytime_cancel = cancel
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, self._poll_anytime_results, generation)
+
+
+    def _cancel_anytime_search(self):
+        """
+        Macht alle bisherigen Suchen ungültig: erhöht die Generation, sodass ihre Queue nicht mehr abgefragt wird,
+        und bricht eine laufende Schnellsuche ab.
+        """
+        self.search_generation += 1
+        if self.anytime_cancel is not None:
+            self.anytime_cancel.set()
+            print("Laufende Schnellsuche abgebrochen.")
+        self.anytime_cancel = None
+        self.anytime_queue = None
+
+
+    def _poll_anytime_results(self, generation):
+        """
+        Zeichnet das jeweils neueste Zwischenergebnis der Schnellsuche ein.
+        :param generation: Generation der Suche; ist sie veraltet (neues DEM, neue Suche), wird die Abfrage beendet
+        """
+        if generation != self.search_generation:
+            return
+
+        latest, done = None, False
+        while not done:
+            try:
+                done, latest = self.anytime_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest is not None:
+            self._render_peaks(latest, verbose=done)
+        if done:
+            self.anytime_queue = None
+            self.anytime_cancel = None
+        else:
+            self.root.after(100, self._poll_anytime_results, generation)
+
+
+    def _render_peaks(self, peaks, verbose=True):
+        """
+        Markiert die Gipfel im Plot und trägt sie in die Tabelle ein. Gipfel, deren Werte noch geschätzt sind
+        (Schnellmodus), werden orange markiert. Bei wiederholten Aufrufen (Zwischenergebnisse) werden nur die
+        geänderten Tabellenzeilen neu geschrieben und die vorhandenen Marker aktualisiert; Auswahl und
+        Hervorhebung bleiben erhalten, solange der Gipfel im Ergebnis bleibt.
+        :param peaks: Ergebnis von find_peaks oder find_peaks_anytime
+        :param verbose: jeden Gipfel zusätzlich in der Konsole ausgeben
+        """
+        try:
+            fig = self.canvas_figure
+
+            if not fig.axes:
+                print("Fehler: Kein Axes-Objekt im Canvas gefunden.")
                 return
+            ax = fig.axes[0]
+
+            self.peaks = peaks
+            n = len(peaks)
+            xs = np.fromiter((peak[0][0] for peak in peaks), dtype=np.int64, count=n)
+            ys = np.fromiter((peak[0][1] for peak in peaks), dtype=np.int64, count=n)
+            exact = np.fromiter((len(peak) < 5 or bool(peak[4]) for peak in peaks), dtype=bool, count=n)  # find_peaks liefert immer exakte Werte
+            zs = self.dem_data[ys, xs]  # Höhe aus DEM daten
+
+            # Pixel-Koordinaten in einem Schritt über die CRS-Welt-Koordinaten nach WGS84 (Lat/Lon) umrechnen
+            try:
+                longs, lats = pixels_to_wgs84(xs, ys, self.geo_transform, self.crs_system)
+            except Exception as wgs_e:
+                print(f"Fehler bei der Umwandlung zu WGS84: {wgs_e}")
+                longs = lats = np.full(n, np.nan)
+
+            if n:
+                print(f"Gefundene Gipfel: {n}")
+            else:
+                print("Keine prominenten Gipfel gefunden mit den aktuellen Kriterien.")
 
-            print(f"Gefundene Gipfel: {len(peaks)}")
-
-            peak_coords_x = []
-            peak_coords_y = []
-            peak_coords_z = []# Für 3D plot
-
-            for idx, (peak_xy, peak_h, prom, dom_pix) in enumerate(peaks, start=1):
-                x, y = peak_xy
-                z = self.dem_data[y, x] # Höhe aus DEM daten
-
-                # Konvertiere Pixel-Koordinaten in CRS-Welt-Koordinaten (Rasterio)
-                try:
-                    world_x, world_y = rasterio.transform.xy(self.geo_transform, y, x)
-                except Exception as trans_e:
-                    print(f"Fehler bei der Koordinatentransformation für Gipfel {idx}: {trans_e}")
-                    continue # Skip bei Fehler
-
-                # Konvertiere CRS-Koordinaten aus der Datei zu WGS84 (Lat/Lon)
-                try:
-                    long, lat = convert_coordinates_to_wgs84(world_x, world_y, self.crs_system)
-                    long_str = f"{long:.8f}" # Formatieren
-                    lat_str = f"{lat:.8f}"  # Formatieren
-                except Exception as wgs_e:
-                    print(f"Fehler bei der Umwandlung zu WGS84 für Gipfel {idx}: {wgs_e}")
-                    long_str, lat_str = "Fehler", "Fehler" # Bei Fehler setzen
-
-                # vorbereiten der Koordinaten für den Plot
-                peak_coords_x.append(x)
-                peak_coords_y.append(y)
-                if self.dimension_switch.get() == 1:
-                    peak_coords_z.append(z + 10) # Offset für mehr Sichtbarkeit in 3D
+            rows = []
+            self.peaks_csv = []
+            for i, peak in enumerate(peaks):
+                idx = i + 1
+                prom, dom_pix = peak[2], peak[3]
+                x, y, z = int(xs[i]), int(ys[i]), zs[i]
+                status = "exakt" if exact[i] else "geschätzt"
+                if np.isfinite(longs[i]) and np.isfinite(lats[i]):
+                    long_str = f"{longs[i]:.8f}" # Formatieren
+                    lat_str = f"{lats[i]:.8f}"  # Formatieren
+                else:
+                    long_str, lat_str = "Fehler", "Fehler"
 
                 # Tabelleintrag erstellen
                 dom_meters = dom_pix / self.pixel_per_meter[1] if self.pixel_per_meter else "N/A"
-                new_entry = (idx, f"{x}, {y}", lat_str, long_str, f"{z}")
-                self.peaks_table.insert("", "end", values=new_entry)
+                rows.append((idx, f"{x}, {y}", lat_str, long_str, f"{z}", status))
 
                 # Speichern der Peaks in einer CSV-Datei
-                csv_new_entry = (idx, f"{x}, {y}", lat_str, long_str, z, prom, f"{dom_meters:.2f}", f"{(prom/z)*100:.2f}")
+                csv_new_entry = (idx, f"{x}, {y}", lat_str, long_str, z, prom, f"{dom_meters:.2f}", f"{(prom/z)*100:.2f}", status)
                 self.peaks_csv.append(csv_new_entry)
-                print(f"({idx}) Gipfel: Pixel(x={x}, y={y}), Höhe={z}m, Lat={lat_str}, Lon={long_str}, Prom={prom}m, Dom={dom_meters:.2f}m, Oro. Dom={(prom/z)*100:.2f}%")
-
-
-            # Plot der Gipfel
-            plot_label = "Gipfel" if peak_coords_x else "" # Label
-            if self.dimension_switch.get() == 1 and peak_coords_x:
-                 # 3D Mode
-                 if hasattr(ax, 'scatter'):
-                    ax.scatter(peak_coords_x, peak_coords_y, peak_coords_z, c='r', marker='^', s=50, depthshade=True, label=plot_label)
-                 else:
-                     print("Warnung: Versuch, 3D-Scatter auf einem 2D-Axes zu zeichnen.")
-            elif peak_coords_x:
-                 # 2D Mode
-                 ax.scatter(peak_coords_x, peak_coords_y, c='r', marker='^', s=40, label=plot_label)
-
+                if verbose:
+                    print(f"({idx}) Gipfel: Pixel(x={x}, y={y}), Höhe={z}m, Lat={lat_str}, Lon={long_str}, Prom={prom}m, Dom={dom_meters:.2f}m, Oro. Dom={(prom/z)*100:.2f}%")
+
+            peak_items = self._update_table_rows(list(zip(xs.tolist(), ys.tolist())), rows)
+
+            # Plot der Gipfel: im 2D-Modus wird der vorhandene Scatter aktualisiert
+            peak_colors = np.where(exact, "r", "orange")
+            peak_coords_z = zs + 10 if ax.name == "3d" else []  # Offset für mehr Sichtbarkeit in 3D
+            if ax.name == "3d" or self.peak_scatter is None:
+                if self.peak_scatter is not None:
+                    self.peak_scatter.remove()
+                    self.peak_scatter = None
+                if ax.name == "3d" and n:
+                    self.peak_scatter = ax.scatter(xs, ys, peak_coords_z, c=peak_colors, marker='^', s=50, depthshade=True, label="Gipfel")
+                elif n:
+                    self.peak_scatter = ax.scatter(xs, ys, c=peak_colors, marker='^', s=40, label="Gipfel")
+            else:
+                self.peak_scatter.set_offsets(np.column_stack([xs, ys]))
+                self.peak_scatter.set_color(peak_colors)
+
+            self._build_peak_index(xs, ys, peak_coords_z, peak_items, keep_selection=True)
 
             # Legende hinzufügen
-            if plot_label and not ax.get_legend(): # Nur eine Legende
+            if self.peak_scatter is not None and not ax.get_legend(): # Nur eine Legende
                  ax.legend()
 
             # canvas aktualisieren
             if self.canvas:
-                self.canvas.draw()
+                self.canvas.draw_idle()
 
         except AttributeError as ae:
-             print(f"AttributeError in show_peaks (möglicherweise fehlt canvas oder figure): {ae}")
+             print(f"AttributeError in _render_peaks (möglicherweise fehlt canvas oder figure): {ae}")
         except IndexError as ie:
-             print(f"IndexError in show_peaks (möglicherweise Problem mit DEM-Daten oder Koordinaten): {ie}")
+             print(f"IndexError in _render_peaks (möglicherweise Problem mit DEM-Daten oder Koordinaten): {ie}")
         except Exception as e:
             import traceback
             print(f"Allgemeiner Fehler beim Markieren der Gipfel: {e}")
             print(traceback.format_exc()) # full traceback für debugging
 
 
+    def _update_table_rows(self, keys, rows):
+        """
+        Gleicht die Tabelle mit den neuen Zeilen ab: weggefallene Gipfel werden gelöscht, neue an ihrer Position
+        eingefügt und bestehende Zeilen nur bei geänderten Werten neu geschrieben. Bestehende Zeilen behalten
+        ihre Item-ID, damit die Auswahl erhalten bleibt.
+        :param keys: Pixelkoordinaten (x, y) der Gipfel, identifizieren die Zeilen
+        :param rows: Tabellenwerte in derselben Reihenfolge
+        :return: Treeview-Zeilen in der Reihenfolge der Gipfel
+        """
+        current = set(keys)
+        for key in [key for key in self.peak_rows if key not in current]:
+            self.peaks_table.delete(self.peak_rows.pop(key)[0])
+
+        items = []
+        for position, (key, values) in enumerate(zip(keys, rows)):
+            if key in self.peak_rows:
+                item, old_values = self.peak_rows[key]
+                if values != old_values:
+                    self.peaks_table.item(item, values=values)
+            else:
+                item = self.peaks_table.insert("", position, values=values)
+            self.peak_rows[key] = (item, values)
+            items.append(item)
+
+        # Reihenfolge nur korrigieren, falls sich die Rangfolge geändert hat
+        if self.peaks_table.get_children() != tuple(items):
+            for position, item in enumerate(items):
+                self.peaks_table.move(item, "", position)
+        return items
+
+
+    def _clear_table(self):
+        """Leert die Gipfel-Tabelle."""
+        if self.peaks_table:
+            self.peaks_table.delete(*self.peaks_table.get_children())
+        self.peak_rows = {}
+
+
+    def _build_peak_index(self, xs, ys, zs, items, keep_selection=False):
+        """
+        Legt den KD-Baum über die Pixelkoordinaten der gezeichneten Gipfel an (Picking per Klick/Hover).
+        Im 3D-Modus wird zusätzlich ein Baum über die projizierten Bildschirmkoordinaten geführt, der erst bei
+        der nächsten Abfrage und nur nach einer Änderung der Ansicht neu aufgebaut wird.
+        :param zs: Markerhöhen (nur im 3D-Modus, sonst leer)
+        :param items: Treeview-Zeilen der Gipfel in derselben Reihenfolge
+        :param keep_selection: Auswahl und Hervorhebung über die Treeview-Zeile auf die neuen Indizes übertragen
+            (sonst zurücksetzen, z. B. nach einem neuen Plot)
+        """
+        selected_item = highlighted_item = None
+        if keep_selection:
+            if self.selected_peak is not None:
+                selected_item = self.peak_items[self.selected_peak]
+            if self.highlighted_peak is not None:
+                highlighted_item = self.peak_items[self.highlighted_peak]
+
+        n = len(xs)
+        self.peak_points = np.column_stack([xs, ys, zs if len(zs) == n else np.zeros(n)]).astype(float) if n else np.empty((0, 3))
+        self.peak_items = list(items)
+        self.peak_item_index = {item: i for i, item in enumerate(self.peak_items)}
+        self.peak_index = cKDTree(self.peak_points[:, :2]) if n else None
+        self.projected_index = None
+        self.projected_key = None
+        if not keep_selection:
+            self.highlight_artist = None  # wurde zusammen mit der alten Figure entfernt
+            self.highlighted_peak = None
+            self.selected_peak = None
+            return
+
+        self.selected_peak = self.peak_item_index.get(selected_item)
+        self.highlighted_peak = self.peak_item_index.get(highlighted_item)
+        if self.highlighted_peak is None and self.highlight_artist is not None:
+            self.highlight_artist.remove()  # hervorgehobener Gipfel ist weggefallen
+            self.highlight_artist = None
+
+
+    def _pick_peak(self, event):
+        """Gibt den Index des Gipfels unter dem Mauszeiger zurück (innerhalb PICK_RADIUS_PX) oder None."""
+        if self.peak_index is None or self.canvas_figure is None or not self.canvas_figure.axes:
+            return None
+        ax = self.canvas_figure.axes[0]
+        if event.inaxes is not ax:
+            return None
+
+        if ax.name == "3d":
+            # Projektion nur neu berechnen, wenn Ansicht oder Fenstergröße sich geändert haben
+            proj = ax.get_proj()
+            key = (proj.tobytes(), tuple(ax.bbox.bounds))
+            if key != self.projected_key:
+                px, py, _ = proj3d.proj_transform(self.peak_points[:, 0], self.peak_points[:, 1], self.peak_points[:, 2], proj)
+                self.projected_index = cKDTree(ax.transData.transform(np.column_stack([px, py])))
+                self.projected_key = key
+            dist, idx = self.projected_index.query((event.x, event.y))
+            return int(idx) if dist <= PICK_RADIUS_PX else None
+
+        if event.xdata is None or event.ydata is None:
+            return None
+        _, idx = self.peak_index.query((event.xdata, event.ydata))
+        # Radius in Bildschirmpixeln prüfen, damit das Picking unabhängig vom Zoom ist
+        screen_x, screen_y = ax.transData.transform(self.peak_points[idx, :2])
+        return int(idx) if np.hypot(screen_x - event.x, screen_y - event.y) <= PICK_RADIUS_PX else None
+
+
+    def _highlight_peak(self, idx):
+        """Hebt den Gipfel idx mit einem gelben Ring hervor (None entfernt die Hervorhebung)."""
+        if idx == self.highlighted_peak:
+            return
+        self.highlighted_peak = idx
+        if self.highlight_artist is not None:
+            self.highlight_artist.remove()
+            self.highlight_artist = None
+        if idx is not None:
+            ax = self.canvas_figure.axes[0]
+            x, y, z = self.peak_points[idx]
+            if ax.name == "3d":
+                self.highlight_artist = ax.scatter([x], [y], [z], s=160, facecolors="none", edgecolors="yellow",
+                                                   linewidths=2, depthshade=False)
+            else:
+                self.highlight_artist = ax.scatter([x], [y], s=140, facecolors="none", edgecolors="yellow", linewidths=2)
+        self.canvas.draw_idle()  # nicht blockierend, mehrere Änderungen werden zu einem Neuzeichnen zusammengefasst
+
+
+    def _on_canvas_click(self, event):
+        """Linksklick: nächsten Gipfel hervorheben und seine Tabellenzeile auswählen."""
+        if event.button != 1:
+            return
+        idx = self._pick_peak(event)
+        if idx is None:
+            return
+        item = self.peak_items[idx]
+        self.peaks_table.selection_set(item)  # löst _on_table_select aus
+        self.peaks_table.see(item)
+        print(f"Ausgewählter Gipfel: {self.peaks_table.item(item, 'values')}")
+
+
+    def _on_canvas_hover(self, event):
+        """
+        Hover: Gipfel unter dem Mauszeiger hervorheben (gedrosselt, nicht während gezogen/gedreht wird).
+        Ereignisse innerhalb von HOVER_INTERVAL werden nicht verworfen: das jeweils letzte wird nach Ablauf des
+        Intervalls ausgewertet, damit die Markierung auch stimmt, wenn die Maus kurz danach stehen bleibt.
+        """
+        if event.button is not None:
+            return
+        wait = HOVER_INTERVAL - (time.monotonic() - self.last_hover_time)
+        if wait > 0:
+            if self.pending_hover is None:
+                self.root.after(int(wait * 1000) + 1, self._flush_hover)
+            self.pending_hover = event
+            return
+        self.pending_hover = None
+        self._apply_hover(event)
+
+
+    def _flush_hover(self):
+        """Wertet das zuletzt gedrosselte Hover-Ereignis aus (per root.after eingeplant)."""
+        event, self.pending_hover = self.pending_hover, None
+        if event is not None:
+            self._apply_hover(event)
+
+
+    def _apply_hover(self, event):
+        """Hebt den Gipfel unter event hervor, sonst wieder den ausgewählten."""
+        self.last_hover_time = time.monotonic()
+        idx = self._pick_peak(event)
+        self._highlight_peak(idx if idx is not None else self.selected_peak)
+
+
+    def _on_table_select(self, event):
+        """Auswahl in der Tabelle: zugehörigen Gipfel im Plot hervorheben."""
+        selection = self.peaks_table.selection()
+        if not selection or selection[0] not in self.peak_item_index:
+            return
+        self.selected_peak = self.peak_item_index[selection[0]]
+        self._highlight_peak(self.selected_peak)
+
+
     def open_settings_window(self):
         """Öffnet ein neues Fenster (Placeholder)."""
         settings_window = Toplevel(self.root)
         settings_window.title("Einstellungen")
-        settings_window.geometry("300x200")
+        settings_window.geometry("300x280")
         settings_window.configure(bg=self.root.cget('bg')) 
 
         # Border-Width einstellen
@@ -385,6 +682,13 @@ class PeakFinderApp:
         bw_entry = ctk.CTkEntry(settings_window, textvariable=bw_var)
         bw_entry.pack(pady=(0,10), padx=20, fill="x")
 
+        # Zeitbudget des Schnellmodus einstellen
+        tb_label = ctk.CTkLabel(settings_window, text="Zeitbudget Schnellmodus (s):")
+        tb_label.pack(pady=(10,5), padx=20, anchor="w")
+        tb_var = ctk.StringVar(value=str(self.time_budget))
+        tb_entry = ctk.CTkEntry(settings_window, textvariable=tb_var)
+        tb_entry.pack(pady=(0,10), padx=20, fill="x")
+
         def save_and_close():
             try:
                 val = int(bw_var.get())
@@ -393,6 +697,13 @@ class PeakFinderApp:
                     print(f"Border-Width aktualisiert auf: {self.border_width} px")
             except ValueError:
                 print(f"Ungültige Eingabe für Randbreite: '{bw_var.get()}'. Behalte alten Wert.")
+            try:
+                val = float(tb_var.get())
+                if val > 0:
+                    self.time_budget = val
+                    print(f"Zeitbudget aktualisiert auf: {self.time_budget} s")
+            except ValueError:
+                print(f"Ungültige Eingabe für Zeitbudget: '{tb_var.get()}'. Behalte alten Wert.")
             settings_window.destroy()
 
         save_btn = ctk.CTkButton(settings_window, text="Speichern", command=save_and_close)
@@ -523,18 +834,28 @@ Die relative Höhe eines Gipfels im Verhältnis zu seiner Prominenz. Sie wird in
 
 
     def export_csv_table(self):
-        """Exportiert die aktuelle Peaks-Tabelle als CSV."""
+        """Exportiert die aktuelle Peaks-Tabelle als CSV, GeoJSON, GeoPackage oder Parquet."""
         # Dateiauswahl-Dialog für Speicherort
         path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV-Dateien", "*.csv"), ("Alle Dateien", "*.*")],
-            title="Tabelle als CSV speichern"
+            filetypes=[("CSV-Dateien", "*.csv"), ("GeoJSON", "*.geojson"), ("GeoPackage", "*.gpkg"),
+                       ("Parquet", "*.parquet"), ("Alle Dateien", "*.*")],
+            title="Tabelle exportieren"
         )
         if not path:
             return  # Abgebrochen
 
+        # Bulk-Export der Rohdaten für alle Formate außer CSV
+        if not path.lower().endswith(".csv"):
+            try:
+                export_peaks(path, self.peaks, self.dem_data, self.geo_transform, self.crs_system, self.pixel_per_meter)
+                print(f"Tabelle erfolgreich exportiert nach: {path}")
+            except Exception as e:
+                print(f"Fehler beim Export der Tabelle: {e}")
+            return
+
         # Spaltenüberschriften aus Treeview
-        cols = [ "Nr.", "Pixel-Koord", "Breitengrad", "Längengrad", "Höhe (m)", "Prominenz (m)", "Dominanz (m)", "Oro. Dominanz (%)" ]
+        cols = [ "Nr.", "Pixel-Koord", "Breitengrad", "Längengrad", "Höhe (m)", "Prominenz (m)", "Dominanz (m)", "Oro. Dominanz (%)", "Status" ]
 
         try:
             with open(path, "w", newline="", encoding="utf-8") as f:
@@ -1,10 +1,11 @@
-import heapq  # neu ergänzen
 import numpy as np
-from scipy.ndimage import maximum_filter
+from scipy.ndimage import maximum_filter, maximum_filter1d
 from scipy.ndimage import distance_transform_edt
 import time
 from skimage.draw import line
 from numba import njit
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 
 def set_image_borders_to_zero(img, width):
@@ -21,28 +22,93 @@ def set_image_borders_to_zero(img, width):
     return img
 
 
-def find_local_maxima(img_data, border_width=2):
+def find_local_maxima(img_data, border_width=2, collapse_plateaus=True):
     """
     Findet lokale Maxima in einem Bildarray und schließt Punkte am Rand aus.
     Gibt eine Liste von Koordinaten zurück, die die Positionen der lokalen Maxima darstellen.
+    Speicherbedarf: ein Filter-Array im Datentyp des DEMs plus zwei Bool-Masken (N * (itemsize + 2) Bytes).
+    Für die Prominenz-Berechnung find_peak_candidates verwenden: die zusammengefassten Plateau-Pixel müssen dort
+    Ziel der Nearest-Higher-Suche bleiben.
     :param img_data: 2D-Array der Höhenwerte
     :param border_width: Breite des Randes, der ausgeschlossen wird
+    :param collapse_plateaus: zusammenhängende Plateaus (flache Gipfel) auf einen Kandidaten reduzieren
+    :return: int32-Array [[y,x], ...]
+    """
+    local_max_list, representative = find_peak_candidates(img_data, border_width)
+    return local_max_list[representative] if collapse_plateaus else local_max_list
+
+
+def find_peak_candidates(img_data, border_width=2):
+    """
+    Lokale Maxima wie find_local_maxima (ohne Zusammenfassung) plus eine Maske der Plateau-Repräsentanten.
+    Nur die Repräsentanten werden ausgewertet; die übrigen Plateau-Pixel bleiben Ziel der Nearest-Higher-Suche,
+    sonst bekäme ein niedrigerer Gipfel, dessen nächsthöheres Pixel zusammengefasst wurde, ein anderes Ziel.
+    :param img_data: 2D-Array der Höhenwerte (Ränder werden in-place genullt)
+    :param border_width: Breite des Randes, der ausgeschlossen wird
+    :return: (int32-Array [[y,x], ...], Bool-Array representative)
     """
     # Ränder des Bildes ausschließen
     img_data = set_image_borders_to_zero(img_data, width=border_width)
 
     # Filter data with maximum filter to find maximum filter response in each neighbourhood
-    max_out = maximum_filter(img_data, size=7)
+    # (Bool-Maske statt float64, das Filterergebnis wird direkt nach dem Vergleich freigegeben)
+    local_max = maximum_filter(img_data, size=7) == img_data
 
     # Find local maxima
-    local_max = np.zeros((img_data.shape))
-    local_max[max_out == img_data] = 1
-    local_max[img_data == np.min(img_data)] = 0  # Minima ausschließen
+    local_max &= img_data != img_data.min()  # Minima ausschließen
+    # Das genullte Randband liefert nie Kandidaten, auch wenn 0 wegen negativer Höhen nicht das Minimum ist
+    set_image_borders_to_zero(local_max, width=border_width)
 
     # Find coordinates of local maxima -> list of maxima
-    local_max_list = np.argwhere(local_max == 1)  # Gibt [[y,x], [y,x], ...] zurück
-    print(f"Anzahl gefundener lokaler Maxima (und nach Randfilter): {len(local_max_list)}")
-    return local_max_list
+    local_max_list = np.argwhere(local_max).astype(np.int32)  # Gibt [[y,x], [y,x], ...] zurück
+    representative = np.zeros(len(local_max_list), dtype=bool)
+    representative[plateau_representatives(local_max_list, img_data.shape)] = True
+    n_collapsed = len(local_max_list) - int(np.count_nonzero(representative))
+    print(f"Anzahl gefundener lokaler Maxima (und nach Randfilter): {len(local_max_list) - n_collapsed}"
+          + (f" ({n_collapsed} Plateau-Pixel zusammengefasst)" if n_collapsed else ""))
+    return local_max_list, representative
+
+
+def plateau_representatives(candidate_peaks_yx, shape):
+    """
+    Fasst 4-verbundene Kandidaten zu einem Repräsentanten pro Plateau zusammen.
+    Benachbarte Maxima des 7x7-Filters sind immer gleich hoch, die Zusammenhangskomponenten der Kandidaten sind
+    also genau die flachen Gipfel. 4-verbunden wie die Sattelsuche: nur diagonal berührende Gipfelpixel können
+    durch einen tieferen Sattel getrennt sein und bleiben eigene Kandidaten. Repräsentant ist das Plateau-Pixel am
+    nächsten am Schwerpunkt (bei Gleichstand das erste in Rasterreihenfolge); der Schwerpunkt selbst kann bei
+    nicht-konvexen Plateaus außerhalb liegen.
+    Die Prominenz ändert sich dadurch nicht: der Maximin-Sattel zu einem Plateau ist für alle Plateau-Pixel gleich.
+    :param candidate_peaks_yx: Kandidaten [[y,x], ...] in Rasterreihenfolge (wie np.argwhere)
+    :param shape: Form des DEMs (rows, cols)
+    :return: Indizes der Repräsentanten in candidate_peaks_yx (aufsteigend)
+    """
+    n = len(candidate_peaks_yx)
+    ys = candidate_peaks_yx[:, 0].astype(np.int64)
+    xs = candidate_peaks_yx[:, 1].astype(np.int64)
+    cols = shape[1]
+    flat = ys * cols + xs
+
+    # Nachbarn rechts und unten per Binärsuche in den sortierten Flat-Indizes
+    src, dst = [], []
+    for dy, dx in ((0, 1), (1, 0)):
+        valid = (xs + dx >= 0) & (xs + dx < cols)
+        pos = np.searchsorted(flat, flat + dy * cols + dx)
+        hit = valid & (pos < n)
+        hit[hit] = flat[pos[hit]] == flat[hit] + dy * cols + dx
+        src.append(np.flatnonzero(hit))
+        dst.append(pos[hit])
+    src, dst = np.concatenate(src), np.concatenate(dst)
+    if not src.size:
+        return np.arange(n)
+
+    graph = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    counts = np.bincount(labels)
+    dist2 = (ys - np.bincount(labels, ys)[labels] / counts[labels]) ** 2 + (xs - np.bincount(labels, xs)[labels] / counts[labels]) ** 2
+    order = np.lexsort((dist2, labels))  # stabil: bei gleichem Abstand gewinnt der erste in Rasterreihenfolge
+    first = np.ones(n, dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    return np.sort(order[first])
 
 
 def get_path_between_points(p1, p2):
@@ -56,138 +122,435 @@ def get_path_between_points(p1, p2):
     return list(zip(cc, rr)) # Gibt eine Liste von (x,y) Tupeln zurück
 
 
-@njit
+@njit(nogil=True)
 def compute_nearest_higher(coords, heights):
     """
     Für jeden Punkt i findet dieses Numba-jit die nächstgelegene, streng höhere Quelle.
     Gibt ein Array nearest mit dem Index des nächsthöheren Peaks (oder -1) zurück.
+    Bei gleichem Abstand gewinnt der kleinere Index. Die Punkte werden absteigend nach Höhe in ein Gitter
+    einsortiert (gleich hohe erst, nachdem alle abgefragt wurden); jede Abfrage sucht ringweise um ihre Zelle,
+    bis kein unbesuchter Ring mehr näher liegen kann. Aufwand etwa O(n log n) statt O(n²).
     """
     n = coords.shape[0]
-    nearest = np.full(n, -1, np.int64)
+    nearest = np.full(n, -1, np.int32)
+    if n == 0:
+        return nearest
+
+    # Gitter mit etwa einem Punkt pro Zelle
+    x_min, y_min = coords[:, 0].min(), coords[:, 1].min()
+    width = np.int64(coords[:, 0].max() - x_min) + 1
+    height = np.int64(coords[:, 1].max() - y_min) + 1
+    cell = max(1, int(np.sqrt(width * height / n)))
+    n_cx = (width - 1) // cell + 1
+    n_cy = (height - 1) // cell + 1
+    cell_x = np.empty(n, np.int64)
+    cell_y = np.empty(n, np.int64)
+    for i in range(n):
+        cell_x[i] = (coords[i, 0] - x_min) // cell
+        cell_y[i] = (coords[i, 1] - y_min) // cell
+
+    # Zellen-Listen in Einfügereihenfolge (absteigende Höhe); eingefügt ist jeweils ein Präfix der Liste
+    order = np.argsort(-heights.astype(np.float64), kind="mergesort")
+    cell_start = np.zeros(n_cx * n_cy + 1, np.int64)
     for i in range(n):
-        xi, yi = coords[i, 0], coords[i, 1]
-        hi = heights[i]
-        min_d = 1e12
-        best = -1
-        for j in range(n):
-            hj = heights[j]
-            if hj > hi:
-                dx = xi - coords[j, 0]
-                dy = yi - coords[j, 1]
-                d = np.hypot(dx, dy)
-                if d < min_d:
-                    min_d = d
-                    best = j
-        nearest[i] = best
+        cell_start[cell_y[i] * n_cx + cell_x[i] + 1] += 1
+    for c in range(n_cx * n_cy):
+        cell_start[c + 1] += cell_start[c]
+    cell_fill = cell_start[:-1].copy()
+    items = np.empty(n, np.int64)
+    for k in range(n):
+        i = order[k]
+        c = cell_y[i] * n_cx + cell_x[i]
+        items[cell_fill[c]] = i
+        cell_fill[c] += 1
+    cell_fill[:] = cell_start[:-1]
+
+    k = 0
+    while k < n:
+        group_end = k + 1
+        while group_end < n and heights[order[group_end]] == heights[order[k]]:
+            group_end += 1
+        if k > 0:
+            for g in range(k, group_end):
+                i = order[g]
+                xi, yi = coords[i, 0], coords[i, 1]
+                cx, cy = cell_x[i], cell_y[i]
+                min_d = 1e12
+                best = -1
+                r = 0
+                while True:
+                    for gy in range(max(cy - r, 0), min(cy + r, n_cy - 1) + 1):
+                        step = 1 if abs(gy - cy) == r else 2 * r
+                        for gx in range(cx - r, cx + r + 1, max(step, 1)):
+                            if gx < 0 or gx >= n_cx:
+                                continue
+                            c = gy * n_cx + gx
+                            for e in range(cell_start[c], cell_fill[c]):
+                                j = items[e]
+                                dx = xi - coords[j, 0]
+                                dy = yi - coords[j, 1]
+                                d = np.hypot(dx, dy)
+                                if d < min_d or d == min_d and j < best:
+                                    min_d = d
+                                    best = j
+                    # Unbesuchte Zellen liegen mindestens r * cell + 1 Pixel entfernt
+                    if best >= 0 and min_d < r * cell + 1 or r >= n_cx and r >= n_cy:
+                        break
+                    r += 1
+                nearest[i] = best
+        for g in range(k, group_end):
+            i = order[g]
+            cell_fill[cell_y[i] * n_cx + cell_x[i]] += 1
+        k = group_end
     return nearest
 
-@njit
-def get_maxmin_saddle(height_map, start, end):
+def make_saddle_workspace(height_map):
+    """
+    Legt den wiederverwendbaren Arbeitsbereich für get_maxmin_saddle / prominence_at_least an:
+    best-Puffer, Epochen-Stempel und Epochenzähler. Ein Pixel gilt nur dann als besucht, wenn sein Stempel
+    der aktuellen Epoche entspricht; zwischen zwei Suchen muss daher nichts zurückgesetzt werden.
+    float32 genügt für den best-Puffer bei allen 8/16-Bit-Ganzzahl- und float32-DEMs (verlustfrei),
+    nur breitere Typen bekommen float64.
+    Speicherbedarf: N * 8 Bytes (bzw. N * 12 Bytes bei breiten Datentypen).
+    """
+    best = np.empty(height_map.shape, dtype=_saddle_dtype(height_map.dtype))
+    stamp = np.zeros(height_map.shape, dtype=np.int32)
+    epoch = np.zeros(1, dtype=np.int64)
+    return best, stamp, epoch
+
+
+@njit(nogil=True)
+def _bottleneck_search(height_map, start, end, peak_h, threshold, workspace):
+    """
+    Maximin-Dijkstra (Bottleneck-Pfad) von start nach end auf einem typisierten Max-Heap (parallele Arrays für
+    Sattelwert, Manhattan-Abstand zum Ziel und Pixelindex; veraltete Einträge werden beim Entnehmen übersprungen).
+    Bei gleichem Sattelwert wird das Pixel näher am Ziel zuerst entnommen. Hinter dem Sattel haben alle Pixel
+    denselben Wert, die Suche läuft dann gerichtet auf das Ziel zu statt die ganze Fläche zu fluten.
+    Pixel mit peak_h - Höhe >= threshold werden nicht betreten; mit threshold = inf ist die Suche exakt.
+    Gibt die Sattelhöhe zurück, wenn end erreicht wird, sonst -inf.
+    """
+    best, stamp, epoch = workspace
+    rows, cols = height_map.shape
+    best_f = best.reshape(-1)
+    stamp_f = stamp.reshape(-1)
+
+    # Neue Epoche; beim Überlauf einmalig alle Stempel löschen
+    if epoch[0] >= 2147483647:
+        stamp_f[:] = 0
+        epoch[0] = 0
+    epoch[0] += 1
+    e = epoch[0]
+
+    sx, sy = np.int64(start[0]), np.int64(start[1])
+    ex, ey = np.int64(end[0]), np.int64(end[1])
+    target = ey * cols + ex
+    start_h = np.float64(height_map[sy, sx])
+    if peak_h - start_h >= threshold:
+        return -np.inf
+
+    keys = np.empty(1024, np.float64)
+    dists = np.empty(1024, np.int64)
+    items = np.empty(1024, np.int64)
+    p = sy * cols + sx
+    stamp_f[p] = e
+    best_f[p] = start_h
+    keys[0] = start_h
+    dists[0] = abs(sx - ex) + abs(sy - ey)
+    items[0] = p
+    size = 1
+
+    while size > 0:
+        # Pixel mit dem höchsten Sattelwert entnehmen (Sift-Down des letzten Eintrags)
+        cur_min, p = keys[0], items[0]
+        size -= 1
+        key, dist, item = keys[size], dists[size], items[size]
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and (keys[child + 1] > keys[child]
+                                     or keys[child + 1] == keys[child] and dists[child + 1] < dists[child]):
+                child += 1
+            if keys[child] < key or keys[child] == key and dists[child] >= dist:
+                break
+            keys[i], dists[i], items[i] = keys[child], dists[child], items[child]
+            i = child
+        keys[i], dists[i], items[i] = key, dist, item
+
+        if cur_min < best_f[p]:
+            continue  # veralteter Eintrag
+
+        # Wenn wir am Ziel sind, geben wir den Wert zurück
+        if p == target:
+            return cur_min
+
+        y = p // cols
+        x = p - y * cols
+        # 4-Nachbarn
+        for k in range(4):
+            nx, ny = x, y
+            if k == 0:
+                nx += 1
+            elif k == 1:
+                nx -= 1
+            elif k == 2:
+                ny += 1
+            else:
+                ny -= 1
+            if nx < 0 or nx >= cols or ny < 0 or ny >= rows:
+                continue
+            neigh_h = np.float64(height_map[ny, nx])
+            if peak_h - neigh_h >= threshold:
+                continue
+            saddle = min(cur_min, neigh_h)
+            q = ny * cols + nx
+            if stamp_f[q] != e:
+                stamp_f[q] = e
+                best_f[q] = -np.inf
+            if saddle > best_f[q]:
+                best_f[q] = saddle
+                # Einfügen (Sift-Up), bei Bedarf Heap verdoppeln
+                if size == keys.shape[0]:
+                    new_keys = np.empty(2 * size, np.float64)
+                    new_dists = np.empty(2 * size, np.int64)
+                    new_items = np.empty(2 * size, np.int64)
+                    new_keys[:size] = keys
+                    new_dists[:size] = dists
+                    new_items[:size] = items
+                    keys, dists, items = new_keys, new_dists, new_items
+                dist = abs(nx - ex) + abs(ny - ey)
+                i = size
+                while i > 0:
+                    parent = (i - 1) >> 1
+                    if keys[parent] > saddle or keys[parent] == saddle and dists[parent] <= dist:
+                        break
+                    keys[i], dists[i], items[i] = keys[parent], dists[parent], items[parent]
+                    i = parent
+                keys[i], dists[i], items[i] = saddle, dist, q
+                size += 1
+    return -np.inf
+
+
+@njit(nogil=True)
+def get_maxmin_saddle(height_map, start, end, workspace):
     """
     Findet den Pfad von start->end, dessen niedrigster Punkt (Sattel) maximal ist.
     Gibt die Höhe dieses Sattelpunktes zurück (Maximin- bzw. Bottleneck-Pfad). 
     Ist ein modifizierter Dijkstra-Algorithmus.
     start,end: (x,y)-Tupel in Pixelkoordinaten.
+    workspace: Arbeitsbereich aus make_saddle_workspace, wird für alle Peaks wiederverwendet.
     """
-    rows, cols = height_map.shape
-    sx, sy = start
-    ex, ey = end
+    return _bottleneck_search(height_map, start, end, 0.0, np.inf, workspace)
 
-    # best[y,x] = höchster erreichbarer minimaler Wert bis zu (x,y)
-    best = np.full((rows, cols), -np.inf, dtype=np.float64)
-    best[sy, sx] = float(height_map[sy, sx])
 
-    # PriorityQueue speichert (-Sattelhöhe, x, y)
-    pq = [(-best[sy, sx], sx, sy)]
+@njit(nogil=True)
+def prominence_at_least(height_map, start, end, peak_h, threshold, workspace):
+    """
+    Entscheidungsvariante von get_maxmin_saddle: prüft nur, ob peak_h - Sattel >= threshold gilt.
+    Geflutet werden nur Pixel mit peak_h - Höhe < threshold; die Suche endet, sobald end erreicht ist
+    (Prominenz zu klein) oder die Region erschöpft ist (Prominenz reicht). Der exakte Sattel wird nicht bestimmt.
+    """
+    return _bottleneck_search(height_map, start, end, peak_h, threshold, workspace) == -np.inf
 
-    while pq:
-        cur_min_neg, x, y = heapq.heappop(pq)
-        cur_min = -float(cur_min_neg)
 
-        # Wenn wir am Ziel sind, geben wir den Wert zurück
-        if (x, y) == (ex, ey):
-            return cur_min
+def _saddle_dtype(dtype):
+    """Datentyp des best-Puffers: float32, solange die Höhenwerte darin exakt darstellbar sind."""
+    dtype = np.dtype(dtype)
+    if dtype.kind in "biu" and dtype.itemsize <= 2 or dtype == np.float32:
+        return np.float32
+    return np.float64
 
-        # 4‐Nachbarn
-        for dx, dy in ((1,0), (-1,0), (0,1), (0,-1)):
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < cols and 0 <= ny < rows:
-                neigh_h = float(height_map[ny, nx])
-                saddle = min(cur_min, neigh_h)
-                if saddle > best[ny, nx]:
-                    best[ny, nx] = saddle
-                    heapq.heappush(pq, (-saddle, nx, ny))
 
-    return best[ey, ex]  # Falls Ziel nie erreicht wurde
+def _height_dtype(dtype):
+    """
+    Datentyp für die Höhen der Kandidaten. Entspricht dem bisherigen int64-Cast (Nachkommastellen
+    werden abgeschnitten), nutzt aber int32, solange der Wertebereich des DEMs das erlaubt.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu" and dtype.itemsize >= 4 and dtype != np.int32 or dtype == np.float64:
+        return np.int64
+    return np.int32
+
+
+def _bresenham_saddle(height_map, p1, p2):
+    """Niedrigster Punkt auf der Bresenham-Linie zwischen p1 und p2 ((x, y)-Tupel), vektorisiert."""
+    rr, cc = line(p1[1], p1[0], p2[1], p2[0])
+    return height_map[rr, cc].min()
 
 
-def calculate_prominent_peaks(candidate_peaks_xy, height_map, prominence_threshold, use_dijkstra=True):
+def _sort_candidates(candidate_peaks_xy, height_map):
     """
-    Beschleunigte Version der Prominenz-Berechnung mit Numba für den Nearest-Higher-Teil.
-    Ohne Parallelisierung, behält volle Genauigkeit bei.
-    :param use_dijkstra: Wenn False, nutzt nur Bresenham-Approximation und überspringt Maximin-Dijkstra
+    Sortiert die Kandidaten absteigend nach Höhe und sucht für jeden den nächsthöheren Kandidaten.
+    :return: (coords, heights, order, nearest) - coords/heights bereits sortiert, order = Sortierreihenfolge
     """
-    if not candidate_peaks_xy:
-        return []
-
     # Koordinaten- und Höhen-Arrays
-    coords = np.array(candidate_peaks_xy, dtype=np.int64)  # shape (n, 2)
-    heights = height_map[coords[:, 1], coords[:, 0]].astype(np.int64)
+    coords = np.array(candidate_peaks_xy, dtype=np.int32)  # shape (n, 2)
+    heights = height_map[coords[:, 1], coords[:, 0]].astype(_height_dtype(height_map.dtype))
 
-    # Absteigend nach Höhe sortieren
-    order = np.argsort(-heights)
+    # Absteigend nach Höhe sortieren (stabil, damit gleich hohe Kandidaten deterministisch bleiben)
+    order = np.argsort(-heights, kind="stable")
     coords = coords[order]
     heights = heights[order]
 
     # Nearest-Higher jitted finden
     nearest = compute_nearest_higher(coords, heights)
+    return coords, heights, order, nearest
 
+
+def calculate_prominent_peaks(candidate_peaks_xy, height_map, prominence_threshold, use_dijkstra=True,
+                              evaluate=None, orographic_threshold=0, stats=None, exact=True, representative=None,
+                              line_prominence=False):
+    """
+    Beschleunigte Version der Prominenz-Berechnung mit Numba für den Nearest-Higher-Teil.
+    Ohne Parallelisierung, behält volle Genauigkeit bei.
+    Speicherbedarf: O(n) für die Kandidaten (int32-Koordinaten, int32-Höhen) plus ein einziger,
+    über alle Peaks wiederverwendeter Sattel-Arbeitsbereich (siehe make_saddle_workspace).
+    :param use_dijkstra: Wenn False, nutzt nur Bresenham-Approximation und überspringt Maximin-Dijkstra
+    :param evaluate: optionale Bool-Maske (Reihenfolge wie candidate_peaks_xy). Kandidaten mit False werden nicht
+                     ausgewertet, bleiben aber Ziel der Nearest-Higher-Suche
+    :param orographic_threshold: Kandidaten, deren exakte Prominenz die orographische Dominanz verfehlt, werden
+                                 verworfen (nur mit exact=True; sonst prüft find_peaks nach der exakten Prominenz)
+    :param stats: optionales Dict, in das die Anzahl verworfener Kandidaten je Stufe geschrieben wird
+    :param exact: Wenn False, wird für Kandidaten, die einen Dijkstra brauchen, nur entschieden, ob die Prominenz
+                  die Schwelle erreicht (prominence_at_least). Die Einträge haben dann die Form
+                  ((x, y), Höhe, Prominenz oder None, (x, y) des Nächsthöheren oder None); None heißt, die exakte
+                  Prominenz steht noch aus und kann später mit get_maxmin_saddle bestimmt werden.
+    :param representative: optionale Bool-Maske (Reihenfolge wie candidate_peaks_xy, siehe find_peak_candidates).
+                           Kandidaten mit False sind zusammengefasste Plateau-Pixel: nie ausgewertet, aber Ziel der
+                           Nearest-Higher-Suche
+    :param line_prominence: Wenn True, wird an jeden Eintrag die (abgerundete) Bresenham-Prominenz angehängt, die
+                            find_peaks zusätzlich zur exakten Prominenz gegen die Schwelle prüft
+    evaluate und orographic_threshold greifen erst, wenn der höchste prominente Gipfel gefunden ist, da dieser
+    in find_peaks unabhängig von allen anderen Filtern die unendliche Dominanz erhält.
+    """
+    if not candidate_peaks_xy:
+        return []
+
+    coords, heights, order, nearest = _sort_candidates(candidate_peaks_xy, height_map)
+    evaluate = np.ones(len(coords), dtype=bool) if evaluate is None else np.asarray(evaluate, dtype=bool)[order]
+    representative = (np.ones(len(coords), dtype=bool) if representative is None
+                      else np.asarray(representative, dtype=bool)[order])
+
+    workspace = make_saddle_workspace(height_map) if use_dijkstra else None
+
+    n_prefiltered = n_bound = n_saddle = 0
     prominent_peaks = []
     for i in range(len(coords)):
-        x, y = coords[i]
-        h = heights[i]
+        x, y = int(coords[i, 0]), int(coords[i, 1])
+        h = int(heights[i])
         j = nearest[i]
 
+        if not representative[i]:
+            continue
+        if prominent_peaks and not evaluate[i]:
+            n_prefiltered += 1
+            continue
+
         if j == -1:
             # Höchster Peak
             if h >= prominence_threshold:
-                prominent_peaks.append(((x, y), int(h), int(h)))
+                prominent_peaks.append(((x, y), h, h, None, h))
             continue
 
         # Pfad und Sattelpunkt erst mit Bresenham-Approximation
-        path = get_path_between_points((x, y), tuple(coords[j]))
-        saddle_h = min(height_map[yy, xx] for xx, yy in path)
-        prom = h - saddle_h
-        if prom >= prominence_threshold:
-            if use_dijkstra:
-                # Feine Berechnung des Sattels mit Maximin-Dijkstra
-                saddle_h = get_maxmin_saddle(height_map, (x, y), tuple(coords[j]))
-                prom = h - saddle_h
-                if prom >= prominence_threshold:
-                    prominent_peaks.append(((x, y), int(h), int(prom)))
+        higher_xy = (int(coords[j, 0]), int(coords[j, 1]))
+        saddle_h = _bresenham_saddle(height_map, (x, y), higher_xy)
+        prom = h - float(saddle_h)
+        # Die Bresenham-Linie ist 8-verbunden, die Sattelsuche 4-verbunden: ihr Minimum ist keine Schranke für den
+        # exakten Sattel, sondern ein eigenes Kriterium (wie bisher muss auch die Linien-Prominenz die Schwelle
+        # erreichen). Die orographische Dominanz wird deshalb nur mit der exakten Prominenz geprüft.
+        if prom < prominence_threshold:
+            n_bound += 1
+            continue
+        line_prom = int(prom)
+        if use_dijkstra and exact:
+            # Feine Berechnung des Sattels mit Maximin-Dijkstra
+            saddle_h = get_maxmin_saddle(height_map, (x, y), higher_xy, workspace)
+            if h - saddle_h >= prominence_threshold and not (
+                    prominent_peaks and calculate_orographic_dominance(h, int(h - saddle_h)) < orographic_threshold):
+                prominent_peaks.append(((x, y), h, int(h - saddle_h), None, line_prom))
             else:
-                # Nur Bresenham-Pfad nutzen
-                prominent_peaks.append(((x, y), int(h), int(prom)))
-
+                n_saddle += 1
+        elif use_dijkstra:
+            # Nur entscheiden, ob die Schwelle erreicht wird; die exakte Prominenz folgt bei Bedarf später
+            if prominence_at_least(height_map, (x, y), higher_xy, float(h), float(prominence_threshold), workspace):
+                prominent_peaks.append(((x, y), h, None, higher_xy, line_prom))
+            else:
+                n_saddle += 1
+        else:
+            # Nur Bresenham-Pfad nutzen
+            prominent_peaks.append(((x, y), h, line_prom, None, line_prom))
+
+    if stats is not None:
+        stats["vorfilter"] = stats.get("vorfilter", 0) + n_prefiltered
+        stats["prominenz_schranke"] = stats.get("prominenz_schranke", 0) + n_bound
+        stats["sattel"] = stats.get("sattel", 0) + n_saddle
     print(f"Anzahl prominenter Gipfel: {len(prominent_peaks)}")
-    return prominent_peaks
+    if exact:
+        return [peak[:3] + peak[4:] if line_prominence else peak[:3] for peak in prominent_peaks]
+    return [peak if line_prominence else peak[:4] for peak in prominent_peaks]
 
 
-def calculate_dominance_distance(peak_xy, height_map):
+def dominance_prefilter(height_map, candidate_peaks_yx, dominance_threshold):
+    """
+    Günstiger Vorfilter für die Dominanz: ein Gipfel mit Dominanz >= D ist das strikte Maximum aller Pixel,
+    die näher als D liegen. Geprüft wird mit separablen Maximumfiltern über ein Quadrat (Halbbreite ceil(D/√2)-1)
+    und ein Kreuz (Armlänge ceil(D)-1), die beide vollständig im Kreis mit Radius D liegen.
+    Speicherbedarf: ein Filter-Array im Datentyp des DEMs (N * itemsize Bytes).
+    :param height_map: 2D-Array mit Höhenwerten
+    :param candidate_peaks_yx: int-Array [[y,x], ...] der Kandidaten
+    :param dominance_threshold: Dominanz-Schwelle D in Pixeln
+    :return: Bool-Array, False = Dominanz sicher kleiner als D
+    """
+    rows_idx, cols_idx = candidate_peaks_yx[:, 0], candidate_peaks_yx[:, 1]
+    keep = np.ones(len(candidate_peaks_yx), dtype=bool)
+    if not np.isfinite(dominance_threshold) or dominance_threshold <= 1 or not keep.size:
+        return keep
+
+    peak_heights = height_map[rows_idx, cols_idx]
+    max_extent = max(height_map.shape)
+    half = min(int(np.ceil(dominance_threshold / np.sqrt(2))) - 1, max_extent)
+    arm = min(int(np.ceil(dominance_threshold)) - 1, max_extent)
+    if half >= 1:
+        keep &= maximum_filter(height_map, size=2 * half + 1)[rows_idx, cols_idx] <= peak_heights
+    if arm > half:
+        for axis in (0, 1):
+            keep &= maximum_filter1d(height_map, size=2 * arm + 1, axis=axis)[rows_idx, cols_idx] <= peak_heights
+    return keep
+
+
+def calculate_dominance_distance(peak_xy, height_map, initial_radius=64):
     """
     Berechnet die Dominanz: Distanz zum nähesten Pixel mit größerem Höhenwert auf der Karte
+    Die Distanztransformation läuft zunächst nur auf einem Fenster um den Gipfel; das Fenster wird
+    vergrößert, bis der gefundene Abstand innerhalb des Fensters liegt (dann ist er exakt).
+    Speicherbedarf: ~34 Bytes pro Fensterpixel (1 Byte Maske plus ~33 Bytes für int32-Feature-Transform,
+    float64-Distanzen und Zwischenpuffer der EDT), im schlechtesten Fall (Fenster = ganze Karte) also ~34 * N Bytes.
     peak_xy: (x, y) des aktuellen Gipfels
     height_map: 2D-Array mit Höhenwerten
+    initial_radius: Anfangsradius des Fensters in Pixeln
     """
     x, y = peak_xy
     h0 = height_map[y, x]
+    rows, cols = height_map.shape
 
-    # Maske aller Pixel < h0 → distance_transform_edt liefert Abstand
-    # zum nächsten False-Pixel (also ≥ h0)
-    mask = (height_map < h0)
-    mask[y, x] = True   # mich selbst aus der False-Fläche entfernen
-    dist_map = distance_transform_edt(mask)
-    return dist_map[y, x]
+    radius = initial_radius
+    while True:
+        y0, y1 = max(y - radius, 0), min(y + radius + 1, rows)
+        x0, x1 = max(x - radius, 0), min(x + radius + 1, cols)
+        covers_map = y0 == 0 and x0 == 0 and y1 == rows and x1 == cols
+
+        # Maske aller Pixel < h0 → distance_transform_edt liefert Abstand
+        # zum nächsten False-Pixel (also ≥ h0)
+        mask = (height_map[y0:y1, x0:x1] < h0)
+        mask[y - y0, x - x0] = True   # mich selbst aus der False-Fläche entfernen
+        if covers_map or not mask.all():
+            dist = distance_transform_edt(mask)[y - y0, x - x0]
+            # Pixel außerhalb des Fensters sind weiter als radius entfernt
+            if covers_map or dist <= radius:
+                return dist
+        radius *= 4
 
 def calculate_orographic_dominance(peak_height, prominence):
     """
@@ -197,7 +560,34 @@ def calculate_orographic_dominance(peak_height, prominence):
         return 0
     return (prominence / peak_height) * 100
 
-def find_peaks(dem_data, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0, border_width=50, min_height=0):
+def estimate_memory_usage(shape, dtype, n_candidates=0):
+    """
+    Schätzt den Spitzen-Speicherbedarf (in Bytes) der einzelnen Analyse-Stufen für ein DEM.
+    Zählt nur die großen numpy-Puffer; Python-Overhead und die Heap-Einträge des Dijkstra sind nicht enthalten.
+    :param shape: Form des DEMs (rows, cols)
+    :param dtype: Datentyp des DEMs
+    :param n_candidates: (erwartete) Anzahl lokaler Maxima
+    :return: Dict {Stufe: Bytes}, "peak" ist das Maximum über alle Stufen
+    """
+    n_pixels = int(np.prod(shape))
+    itemsize = np.dtype(dtype).itemsize
+    usage = {
+        # Filter-Ergebnis im DEM-Datentyp + Bool-Maske + temporäre Bool-Maske, argwhere (int64) + int32-Kopie,
+        # Plateau-Zusammenfassung (Flat-Indizes, Nachbarsuche, Komponenten)
+        "find_local_maxima": n_pixels * (itemsize + 2) + n_candidates * 120,
+        # Ein Filter-Array im DEM-Datentyp, je Kandidat intp-Indizes (Fancy-Indexing), Höhen und Bool-Masken
+        "dominance_prefilter": n_pixels * itemsize + n_candidates * 24,
+        # Sattel-Arbeitsbereich (best-Puffer, Epochen-Stempel) + Koordinaten, Höhen, Sortierung, Nearest-Higher
+        "calculate_prominent_peaks": n_pixels * (np.dtype(_saddle_dtype(dtype)).itemsize + 4) + n_candidates * 32,
+        # Schlechtester Fall der Distanztransformation (ganze Karte): Maske + EDT
+        "calculate_dominance_distance": n_pixels * 34,
+    }
+    usage["peak"] = max(usage.values())
+    return usage
+
+
+def find_peaks(dem_data, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0, border_width=50, min_height=0,
+               use_dijkstra=True):
     """
     Findet lokale Maxima und filtert sie dann nach Prominenz, Dominanz und Mindesthöhe.
     Gibt eine Liste aller prominenten Gipfel zurück: [(x, y), Höhe, Prominenz, Dominanz]
@@ -207,25 +597,48 @@ def find_peaks(dem_data, prominence_threshold_val=500, dominance_threshold_val=1
     :param orographic_dominence_threshold_val: Mindestwert für die orographische Dominanz
     :param border_width: Breite des Randes, der ausgeschlossen wird
     :param min_height: Mindesthöhe, die ein Gipfel haben muss, um berücksichtigt zu werden
+    :param use_dijkstra: Wenn False, wird die Prominenz nur mit der Bresenham-Approximation bestimmt (schneller, ungenau)
+    Speicherbedarf pro Stufe: siehe estimate_memory_usage. dem_data wird nicht kopiert (Ränder werden in-place genullt).
+    Die Kandidaten laufen durch eine nach Kosten geordnete Kaskade: Mindesthöhe, Dominanz-Maximumfilter,
+    Bresenham-Linie für die Prominenz, Schwellen-Entscheidung per Sattelsuche, exakte Dominanz
+    und zuletzt die exakte Prominenz nur für die verbliebenen Gipfel.
     """
-    candidate_peaks_yx = find_local_maxima(dem_data, border_width)  # Gibt [[y,x], ...] zurück
+    candidate_peaks_yx, representative = find_peak_candidates(dem_data, border_width)  # Gibt [[y,x], ...] zurück
 
     if not candidate_peaks_yx.size:
         return []
 
-    candidate_peaks_xy_list = [(c, r) for r, c in candidate_peaks_yx]  # Konvertiere in eine Liste von (x, y)-Koordinaten
-    prominent_peaks_info = calculate_prominent_peaks(candidate_peaks_xy_list, dem_data, prominence_threshold_val)  # Berechne die Prominenz und filtere danach -> Liste
+    # Stufe 1: Mindesthöhe. Niedrigere Kandidaten können nie Nearest-Higher eines höheren Kandidaten sein
+    heights = dem_data[candidate_peaks_yx[:, 0], candidate_peaks_yx[:, 1]].astype(_height_dtype(dem_data.dtype))
+    high_enough = heights >= min_height
+    stats = {"mindesthoehe": int(np.count_nonzero(~high_enough & representative))}
+    candidate_peaks_yx, representative = candidate_peaks_yx[high_enough], representative[high_enough]
+    if not candidate_peaks_yx.size:
+        print(f"Verworfene Kandidaten je Stufe: {stats}")
+        return []
 
-    filtered_peaks = []
-    sorted_peaks = sorted([(peak_xy, peak_h, prominence) for peak_xy, peak_h, prominence in prominent_peaks_info], key=lambda p: -p[1])
-    for i, (peak_xy, peak_h, prominence) in enumerate(sorted_peaks):
+    # Stufe 2: Dominanz-Maximumfilter (Kandidaten bleiben Ziel der Nearest-Higher-Suche)
+    evaluate = dominance_prefilter(dem_data, candidate_peaks_yx, dominance_threshold_val)
+
+    # Stufe 3 + 4: Bresenham-Linie und exakter Sattel
+    candidate_peaks_xy_list = [(c, r) for r, c in candidate_peaks_yx]  # Konvertiere in eine Liste von (x, y)-Koordinaten
+    # Die Sattelsuche entscheidet nur über die Schwelle, die exakte Prominenz folgt erst in Stufe 6
+    prominent_peaks_info = calculate_prominent_peaks(candidate_peaks_xy_list, dem_data, prominence_threshold_val,
+                                                     evaluate=evaluate, representative=representative,
+                                                     orographic_threshold=orographic_dominence_threshold_val,
+                                                     stats=stats, use_dijkstra=use_dijkstra, exact=False)  # Berechne die Prominenz und filtere danach -> Liste
+
+    # Stufe 5: exakte Dominanz
+    stats["dominanz"] = 0
+    dominant_peaks = []
+    sorted_peaks = sorted(prominent_peaks_info, key=lambda p: -p[1])
+    for i, (peak_xy, peak_h, prominence, higher_xy) in enumerate(sorted_peaks):
         # Mindesthöhe
         if peak_h < min_height:
             continue  # Gipfel ausschließen, wenn die Höhe unter der Mindesthöhe liegt
         
-        # orografische Dominanz
-        orographic_dominance = calculate_orographic_dominance(peak_h, prominence)
-        if orographic_dominance < orographic_dominence_threshold_val:
+        # orografische Dominanz (sofern die Prominenz schon exakt feststeht)
+        if prominence is not None and calculate_orographic_dominance(peak_h, prominence) < orographic_dominence_threshold_val:
             continue  # Gipfel ausschließen, wenn die orographische Dominanz unter dem Schwellenwert liegt
         
         # Dominanz
@@ -235,13 +648,168 @@ def find_peaks(dem_data, prominence_threshold_val=500, dominance_threshold_val=1
         else: 
             dominance = calculate_dominance_distance(peak_xy, dem_data)            
         if dominance >= dominance_threshold_val:
-            filtered_peaks.append((peak_xy, peak_h, prominence, dominance))
+            dominant_peaks.append((peak_xy, peak_h, prominence, dominance, higher_xy))
             # print(f"  Prominenter Gipfel: {peak_xy} (x,y) mit Höhe: {peak_h}, Prominenz: {prominence}, Dominanz: {dominance}")
+        else:
+            stats["dominanz"] += 1
+
+    # Stufe 6: exakte Prominenz nur für die verbliebenen Gipfel
+    filtered_peaks = []
+    workspace = None
+    for peak_xy, peak_h, prominence, dominance, higher_xy in dominant_peaks:
+        if prominence is None:
+            if workspace is None:
+                workspace = make_saddle_workspace(dem_data)
+            prominence = int(peak_h - get_maxmin_saddle(dem_data, peak_xy, higher_xy, workspace))
+            if calculate_orographic_dominance(peak_h, prominence) < orographic_dominence_threshold_val:
+                continue
+        filtered_peaks.append((peak_xy, peak_h, prominence, dominance))
+    print(f"Verworfene Kandidaten je Stufe: {stats}")
     print(f"Anzahl Gipfel: {len(filtered_peaks)}")
 
     return filtered_peaks
 
 
+def find_peaks_anytime(dem_data, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0,
+                       border_width=50, min_height=0, time_budget=1.0, callback=None, callback_interval=0.25, cancel=None):
+    """
+    Anytime-Variante von find_peaks: liefert nach Ablauf von time_budget Sekunden das beste verfügbare Ergebnis.
+    Zuerst bekommen alle Kandidaten Schätzungen (Bresenham-Prominenz, Abstand zum nächsthöheren Kandidaten als
+    Dominanz; nur letzterer ist eine obere Schranke). Danach werden abwechselnd die höchsten und die knappsten
+    Kandidaten exakt nachgerechnet (Maximin-Sattel, Distanztransformation), solange Zeit bleibt.
+    Gibt eine Liste [(x, y), Höhe, Prominenz, Dominanz, exakt] zurück; exakt=False heißt, Prominenz und/oder
+    Dominanz sind noch Schätzungen. Reicht das Budget für alle Kandidaten, ist das Ergebnis identisch mit find_peaks.
+    :param time_budget: Zeitbudget in Sekunden (ab Aufruf)
+    :param callback: optionale Funktion, die während der Verfeinerung mit dem jeweils aktuellen Ergebnis aufgerufen wird
+    :param callback_interval: minimaler Abstand zwischen zwei callback-Aufrufen in Sekunden
+    :param cancel: optionales threading.Event; sobald es gesetzt ist, endet die Verfeinerung wie bei Ablauf des Budgets
+    """
+    deadline = time.monotonic() + time_budget
+    candidate_peaks_yx, representative = find_peak_candidates(dem_data, border_width)
+    if not candidate_peaks_yx.size:
+        return []
+    heights = dem_data[candidate_peaks_yx[:, 0], candidate_peaks_yx[:, 1]].astype(_height_dtype(dem_data.dtype))
+    high_enough = heights >= min_height
+    candidate_peaks_yx, representative = candidate_peaks_yx[high_enough], representative[high_enough]
+    if not candidate_peaks_yx.size:
+        return []
+
+    evaluate = dominance_prefilter(dem_data, candidate_peaks_yx, dominance_threshold_val)
+    coords, heights, order, nearest = _sort_candidates([(c, r) for r, c in candidate_peaks_yx], dem_data)
+    evaluate, representative = evaluate[order], representative[order]
+    n = len(coords)
+
+    # Wie in find_peaks: ist der höchste Kandidat prominent, bekommt er die unendliche Dominanz und alle
+    # Schranken dürfen auf die übrigen Kandidaten angewendet werden (zusammengefasste Plateau-Pixel sind nur Ziele)
+    top = int(np.argmax(representative))
+    use_bounds = heights[top] >= prominence_threshold_val
+
+    # --- Schätzungen (Bresenham-Prominenz, Dominanz als obere Schranke) ---
+    prom = np.empty(n)
+    dom = np.full(n, np.inf)
+    prom_exact = np.zeros(n, dtype=bool)
+    dom_exact = np.zeros(n, dtype=bool)
+    alive = np.zeros(n, dtype=bool)
+    for i in range(n):
+        h = int(heights[i])
+        j = nearest[i]
+        if not representative[i] or use_bounds and i > top and not evaluate[i]:
+            continue
+        if j == -1:
+            prom[i] = h
+            prom_exact[i] = True
+        else:
+            higher_xy = (int(coords[j, 0]), int(coords[j, 1]))
+            prom[i] = h - float(_bresenham_saddle(dem_data, (int(coords[i, 0]), int(coords[i, 1])), higher_xy))
+            dom[i] = np.hypot(float(coords[i, 0] - coords[j, 0]), float(coords[i, 1] - coords[j, 1]))
+        # Wie in find_peaks muss auch die Bresenham-Prominenz die Schwelle erreichen; für die orographische
+        # Dominanz ist sie keine Schranke (8- gegen 4-verbundenen Pfad), die prüft erst current_result
+        alive[i] = prom[i] >= prominence_threshold_val
+        if use_bounds and i > top and alive[i]:
+            alive[i] = dom[i] >= dominance_threshold_val
+
+    def current_result():
+        result = []
+        alive_ids = np.flatnonzero(alive)
+        for rank, i in enumerate(alive_ids):
+            h, p = int(heights[i]), int(prom[i])
+            if calculate_orographic_dominance(h, p) < orographic_dominence_threshold_val:
+                continue
+            d, exact = (np.inf, bool(prom_exact[i])) if rank == 0 else (dom[i], bool(prom_exact[i] and dom_exact[i]))
+            if d >= dominance_threshold_val:
+                result.append(((int(coords[i, 0]), int(coords[i, 1])), h, p, d, exact))
+        return result
+
+    # --- Verfeinerung: abwechselnd nach Höhe und nach Knappheit (Schätzung / Schwelle) ---
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slack = np.minimum(prom / prominence_threshold_val, dom / dominance_threshold_val)
+    by_height = np.flatnonzero(alive)
+    by_slack = by_height[np.argsort(slack[by_height], kind="stable")]
+    queues = [iter(by_height), iter(by_slack)]
+
+    workspace = make_saddle_workspace(dem_data)
+    refined = set()
+    last_callback = time.monotonic()
+    turn = 0
+    cancelled = cancel.is_set if cancel is not None else lambda: False
+    while queues and time.monotonic() < deadline and not cancelled():
+        i = next(queues[turn % len(queues)], None)
+        if i is None:
+            queues.pop(turn % len(queues))
+            continue
+        turn += 1
+        if i in refined or not alive[i]:
+            continue
+        refined.add(i)
+
+        x, y, h = int(coords[i, 0]), int(coords[i, 1]), int(heights[i])
+        if not prom_exact[i]:
+            higher_xy = (int(coords[nearest[i], 0]), int(coords[nearest[i], 1]))
+            prom[i] = h - get_maxmin_saddle(dem_data, (x, y), higher_xy, workspace)
+            prom_exact[i] = True
+            if prom[i] < prominence_threshold_val:
+                alive[i] = False
+                continue
+        if time.monotonic() >= deadline or cancelled():
+            break
+        if not dom_exact[i]:
+            if i != np.argmax(alive) and calculate_orographic_dominance(h, int(prom[i])) >= orographic_dominence_threshold_val:
+                dom[i] = calculate_dominance_distance((x, y), dem_data)
+            dom_exact[i] = True
+
+        if callback is not None and time.monotonic() - last_callback >= callback_interval:
+            callback(current_result())
+            last_callback = time.monotonic()
+
+    result = current_result()
+    print(f"Anytime: {len(refined)} von {len(by_height)} Kandidaten verfeinert, "
+          f"{sum(p[4] for p in result)} von {len(result)} Gipfeln exakt")
+    return result
+
+
+def make_test_dem(size, n_hills, sigma_range, height_range=(300, 2000), margin=60, noise=0, seed=0):
+    """
+    Künstliches Gebirge aus Gauß-Hügeln für Tests und Demos.
+    :param size: Kantenlänge des quadratischen DEMs in Pixeln
+    :param n_hills: Anzahl der Hügel
+    :param sigma_range: (min, max) der Hügelbreite in Pixeln
+    :param height_range: (min, max) der Hügelhöhe in m
+    :param margin: Mindestabstand der Hügelmitten vom Rand in Pixeln
+    :param noise: Amplitude eines gleichverteilten Rauschens in m (0 = kein Rauschen)
+    :param seed: Startwert des Zufallsgenerators
+    :return: int16-Array (size x size)
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.ogrid[0:size, 0:size]
+    dem = np.zeros((size, size), dtype=np.float32)
+    for _ in range(n_hills):
+        cx, cy = rng.uniform(margin, size - margin, 2)
+        dem += rng.uniform(*height_range) * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * rng.uniform(*sigma_range) ** 2))
+    if noise:
+        dem = dem + rng.uniform(0, noise, dem.shape)
+    return dem.astype(np.int16)
+
+
 if __name__ == "__main__":
     # Beispiel-Test mit einem künstlichen DEM-Array
     print("\n--- Test für find_peaks ---")
@@ -259,6 +827,99 @@ if __name__ == "__main__":
     else:
         print("Kein prominenter Gipfel gefunden.")
 
+    # Anytime-Modus: mit ausreichendem Budget identisch mit find_peaks, mit knappem Budget teils geschätzt
+    print("\n--- Test für find_peaks_anytime ---")
+    anytime_results = find_peaks_anytime(test_dem, prominence_threshold_val=100, dominance_threshold_val=10, time_budget=60)
+    assert [p[:4] for p in anytime_results] == results, "Anytime-Ergebnis weicht von find_peaks ab"
+    for peak_xy, peak_h, prom, dom, exact in anytime_results:
+        print(f"  (x={peak_xy[0]}, y={peak_xy[1]}), Höhe: {peak_h}, Prominenz: {prom}, {'exakt' if exact else 'geschätzt'}")
+
+    # Gitter-Suche des Nächsthöheren gegen den direkten Vergleich aller Paare (viele gleiche Höhen und Abstände)
+    print("\n--- Test für compute_nearest_higher ---")
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        nh_coords = rng.integers(0, 40, (300, 2)).astype(np.int32)
+        nh_heights = rng.integers(0, 6, 300).astype(np.int32)
+        distances = np.hypot(*(nh_coords[:, None, :] - nh_coords[None, :, :]).transpose(2, 0, 1))
+        distances[nh_heights[None, :] <= nh_heights[:, None]] = np.inf
+        expected_nearest = np.where(np.isinf(distances.min(axis=1)), -1, distances.argmin(axis=1))
+        assert np.array_equal(compute_nearest_higher(nh_coords, nh_heights), expected_nearest), "Nächsthöherer weicht ab"
+    print("  identisch mit dem direkten Vergleich")
+
+    # Plateaus werden 4-verbunden zusammengefasst wie die Sattelsuche: zwei nur diagonal berührende Gipfelpixel
+    # mit tiefem Sattel bleiben getrennt, sonst bekäme C über den falschen Nächsthöheren eine zu hohe Prominenz
+    print("\n--- Test für diagonale Gipfelpixel ---")
+    diagonal_dem = np.zeros((40, 40), dtype=np.int16)
+    diagonal_dem[10, 10] = diagonal_dem[11, 11] = 100
+    diagonal_dem[10, 11] = diagonal_dem[11, 10] = 50
+    diagonal_dem[11, 12:25] = 80  # Grat von (11, 11) zum 90 m hohen Gipfel C
+    diagonal_dem[11, 25] = 90
+    diagonal_results = find_peaks(diagonal_dem, prominence_threshold_val=30, dominance_threshold_val=1, border_width=2)
+    assert all(peak_xy != (25, 11) for peak_xy, *_ in diagonal_results), "C (Prominenz 10) darf nicht prominent sein"
+    print(f"  {[peak_xy for peak_xy, *_ in diagonal_results]}")
+
+    # Plateau-Zusammenfassung: Kandidatenreduktion auf den Test-DEMs
+    import glob
+    import os
+    from reader import read_dem
+    print("\n--- Plateau-Zusammenfassung auf test-data ---")
+    for dem_path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data", "*.tif"))):
+        dem = read_dem(dem_path)[0]
+        n_all = len(find_local_maxima(dem.copy(), 50, collapse_plateaus=False))
+        n_collapsed = len(find_local_maxima(dem.copy(), 50))
+        print(f"  {os.path.basename(dem_path)} ({dem.dtype}): {n_all} -> {n_collapsed} Kandidaten "
+              f"(-{(n_all - n_collapsed) / max(n_all, 1) * 100:.1f}%)")
+
+    # Orographische Dominanz: die Kaskade darf nur mit der exakten Prominenz filtern (die 8-verbundene
+    # Bresenham-Linie ist keine Schranke für den 4-verbundenen Sattel)
+    print("\n--- Orographische Dominanz auf Valais.tif ---")
+    dem = read_dem(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data", "Valais.tif"))[0]
+    oro_results = find_peaks(dem.copy(), prominence_threshold_val=30, dominance_threshold_val=1.5,
+                             orographic_dominence_threshold_val=3)
+    expected = [p for p in find_peaks(dem.copy(), prominence_threshold_val=30, dominance_threshold_val=1.5)
+                if calculate_orographic_dominance(p[1], p[2]) >= 3]
+    assert oro_results == expected, "Orographischer Filter weicht von der exakten Prominenz ab"
+    print(f"  {len(oro_results)} Gipfel, identisch mit dem nachträglichen Filter")
+
+    # Speichertest: jede Stufe von find_peaks einzeln gegen ihre Schätzung mit der echten Kandidatenzahl
+    import tracemalloc
+    mem_size = 1500
+    print(f"\n--- Speichertest für find_peaks ({mem_size}x{mem_size}, int16) ---")
+    mem_test_dem = make_test_dem(mem_size, 30, sigma_range=(30, 150), height_range=(500, 3000), margin=100)
+
+    def traced(func, *args, **kwargs):
+        """Führt func aus und gibt (Ergebnis, zusätzliche Spitze in Bytes über dem schon belegten Speicher) zurück."""
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1] - base
+
+    find_peaks(mem_test_dem.copy(), prominence_threshold_val=200, dominance_threshold_val=10)  # Numba-Kompilierung vorab
+    tracemalloc.start()
+    (mem_yx, mem_representative), mem_peak = traced(find_peak_candidates, mem_test_dem, 50)
+    mem_estimate = estimate_memory_usage(mem_test_dem.shape, mem_test_dem.dtype, n_candidates=len(mem_yx))
+    stage_peaks = {"find_local_maxima": mem_peak}
+    mem_evaluate, stage_peaks["dominance_prefilter"] = traced(dominance_prefilter, mem_test_dem, mem_yx, 10)
+    mem_xy = [(c, r) for r, c in mem_yx]
+    mem_prominent, stage_peaks["calculate_prominent_peaks"] = traced(
+        calculate_prominent_peaks, mem_xy, mem_test_dem, 200, evaluate=mem_evaluate,
+        representative=mem_representative, exact=False)
+    # Dominanz: größte Spitze über alle gefensterten Distanztransformationen gegen die ganze Karte
+    stage_peaks["calculate_dominance_distance"] = max(
+        traced(calculate_dominance_distance, peak_xy, mem_test_dem)[1] for peak_xy, *_ in mem_prominent[1:])
+    whole_map_peak = traced(calculate_dominance_distance, mem_prominent[1][0], mem_test_dem,
+                            initial_radius=mem_size)[1]
+    tracemalloc.stop()
+
+    print(f"  {len(mem_yx)} Kandidaten, {len(mem_prominent)} prominente Gipfel")
+    python_overhead = 64 * 1024  # Python-Objekte zählt estimate_memory_usage nicht mit
+    for stage, stage_peak in stage_peaks.items():
+        print(f"  {stage}: Spitze {stage_peak / 1e6:.1f} MB, Schätzung {mem_estimate[stage] / 1e6:.1f} MB")
+        assert stage_peak <= mem_estimate[stage] + python_overhead, f"Speicherbedarf von {stage} über der Schätzung"
+    print(f"  Distanztransformation über die ganze Karte: {whole_map_peak / 1e6:.1f} MB")
+    assert whole_map_peak <= mem_estimate["calculate_dominance_distance"] + python_overhead, "Ganze Karte über der Schätzung"
+    assert stage_peaks["calculate_dominance_distance"] < whole_map_peak, "Fenster nicht kleiner als die ganze Karte"
+
     # Geschwindigkeitstest für calculate_prominence
     data_size = 500
     print(f"\n--- Geschwindigkeitstest für Prominenzberechnung ({data_size}x{data_size}) ---")
@@ -0,0 +1,376 @@
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numba import from_dtype
+
+from peak_analysis import (find_peaks, find_peaks_anytime, find_peak_candidates, estimate_memory_usage,
+                           compute_nearest_higher, get_maxmin_saddle, prominence_at_least)
+from sharded_analysis import find_peaks_sharded, FILTER_HALO, _reduced_saddle_tree, _answer_bottleneck_queries
+from reader import read_dem_fast, read_dem_shape, read_dem_window
+
+SAMPLE_SIZE = 512       # Kantenlänge des Probeausschnitts, auf dem die Laufzeit kalibriert wird
+TIME_EXPONENT = 1.5     # Laufzeit wächst überlinear: Kandidaten ~ N, Flutfläche der Sattelsuche je Kandidat ~ sqrt(N)
+SHARDED_OVERHEAD = 1.5  # Verlust der parallelen Analyse gegenüber linearem Speed-up (Koordinator, Datentransfer)
+EXACT_STRATEGIES = ("exakt", "parallel", "kachelweise")
+PLANNING_SHARE = 0.25   # höchstens dieser Anteil des Zeitbudgets darf für Kalibrierungsläufe verbraucht werden
+SCAN_SHARE = 0.1        # grober Anteil des Kandidaten-Scans an einem find_peaks-Lauf (Vorab-Schätzung ohne Kalibrierung)
+
+
+def available_memory():
+    """Verfügbarer physischer Speicher in Bytes (über os.sysconf), None wenn das System ihn nicht meldet."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _sample(source, shape):
+    """Zentraler Probeausschnitt (höchstens SAMPLE_SIZE x SAMPLE_SIZE) als eigenständige Kopie."""
+    rows, cols = shape
+    height, width = min(SAMPLE_SIZE, rows), min(SAMPLE_SIZE, cols)
+    row_off, col_off = (rows - height) // 2, (cols - width) // 2
+    if isinstance(source, str):
+        return read_dem_window(source, row_off, col_off, height, width)
+    return np.array(source[row_off:row_off + height, col_off:col_off + width])
+
+
+def _kernels_compiled(dtype):
+    """True, wenn die numba-Kernel der exakten Analyse für diesen Datentyp schon kompiliert sind (sonst kostet der erste Lauf einige Sekunden JIT-Zeit)."""
+    height_type = from_dtype(np.dtype(dtype))
+    return bool(compute_nearest_higher.signatures) and all(
+        any(signature[0].dtype == height_type for signature in kernel.signatures)
+        for kernel in (get_maxmin_saddle, prominence_at_least))
+
+
+def _calibrate(sample, params, deadline=None):
+    """
+    Misst auf dem Probeausschnitt die Kandidatendichte und die Laufzeit der exakten und der approximativen
+    Analyse. Der erste Lauf dient nur der JIT-Kompilierung und wird nicht gewertet.
+    Mit deadline (Zeitpunkt von time.perf_counter) wird nur kalibriert, wenn die Kernel schon kompiliert sind und
+    die aus dem Kandidaten-Scan geschätzten Läufe vor der deadline enden; sonst bleiben die Zeiten None.
+    :return: Dict mit candidates, scan_time, exact_time, approx_time, jit_time (Sekunden)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        candidates = len(find_peak_candidates(sample.copy(), params["border_width"])[0])
+        scan_time = time.perf_counter() - start_time
+        calibration = {"candidates": candidates, "scan_time": scan_time, "exact_time": None, "approx_time": None,
+                       "jit_time": None}
+        if deadline is not None:
+            if not _kernels_compiled(sample.dtype) or time.perf_counter() + 2 * scan_time / SCAN_SHARE > deadline:
+                return calibration
+        else:
+            start_time = time.perf_counter()
+            find_peaks(sample.copy(), **params)
+            calibration["jit_time"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        find_peaks(sample.copy(), **params)
+        calibration["exact_time"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        find_peaks(sample.copy(), use_dijkstra=False, **params)
+        calibration["approx_time"] = time.perf_counter() - start_time
+    return calibration
+
+
+def _calibrate_sharded(sample, params, tile_size):
+    """
+    Misst die verteilte Analyse auf dem Probeausschnitt mit einem Worker-Prozess.
+    Ein Vorlauf auf einem Viertel der Probe kompiliert Koordinator und Tile-Worker im eigenen Prozess (Thread als
+    Worker); per fork gestartete Worker-Prozesse erben den kompilierten Code und zahlen die JIT-Zeit nicht erneut.
+    :return: Dict mit sharded_time (Sekunden) und coordinator_memory (Spitzenbedarf des Koordinators in Bytes,
+             inklusive der Puffer für die Zusammenfassungen aus den Worker-Prozessen)
+    """
+    border = params["border_width"]
+    small = sample[:max(sample.shape[0] // 4, 2 * border + 1), :max(sample.shape[1] // 4, 2 * border + 1)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            find_peaks_sharded(small, tile_size=min(tile_size, max(small.shape) // 2), executor=executor, **params)
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        find_peaks_sharded(sample, tile_size=min(tile_size, max(sample.shape) // 2), max_workers=1, **params)
+        sharded_time = time.perf_counter() - start_time
+        coordinator_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"sharded_time": sharded_time, "coordinator_memory": coordinator_memory}
+
+
+def _sample_border(border_width, shape, sample_shape):
+    """
+    Randbreite für den Probeausschnitt, bei der der genullte Rand denselben Flächenanteil hat wie auf dem ganzen DEM.
+    Der flache Rand verändert Kandidatenzahl und Sattel-Graph, deshalb muss er anteilig in der Probe vorkommen.
+    """
+    rows, cols = shape
+    inner = max(rows - 2 * border_width, 0) * max(cols - 2 * border_width, 0) / (rows * cols)
+    sample_rows, sample_cols = sample_shape
+    # (sample_rows - 2b) * (sample_cols - 2b) = inner * sample_rows * sample_cols, nach b aufgelöst
+    b = ((sample_rows + sample_cols) - np.sqrt((sample_rows - sample_cols) ** 2 + 4 * inner * sample_rows * sample_cols)) / 4
+    return max(int(round(b)), FILTER_HALO)
+
+
+def _tile_memory(tile_size, shape, dtype, n_candidates):
+    """Geschätzter Spitzenbedarf eines Tile-Workers: Tile mit Halo plus die Analyse-Stufen auf dem Tile."""
+    n_pixels = int(np.prod(shape))
+    tile_side = min(tile_size, max(shape)) + 2 * FILTER_HALO
+    tile_pixels = min(tile_side * tile_side, n_pixels)
+    tile_candidates = int(n_candidates * tile_pixels / n_pixels)
+    return tile_pixels * np.dtype(dtype).itemsize + estimate_memory_usage((tile_pixels,), dtype, tile_candidates)["peak"]
+
+
+def plan_execution(source, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0,
+                   border_width=50, min_height=0, time_budget=None, memory_budget=None, tile_size=512, max_workers=None):
+    """
+    Schätzt Laufzeit und Speicherbedarf aller Ausführungsstrategien und wählt eine aus:
+      - exakt:        find_peaks im Speicher
+      - parallel:     find_peaks_sharded mit einem Worker-Prozess pro CPU (exakt)
+      - kachelweise:  find_peaks_sharded mit einem Worker, bei Dateien out-of-core (exakt, kleinster Speicherbedarf)
+      - approximativ: find_peaks mit Bresenham-Prominenz statt Maximin-Dijkstra
+      - anytime:      find_peaks_anytime mit dem Zeitbudget (teils geschätzte Werte)
+    Gewählt wird die schnellste exakte Strategie innerhalb der Budgets, sonst die approximative, sonst anytime;
+    hält keine die Budgets ein, ist strategy None (find_peaks_planned bricht dann ab).
+    Passt das DEM ganz in den Probeausschnitt, entfällt die Kalibrierung und es wird direkt exakt gerechnet, sofern
+    der Speicher reicht (Zeit None in der Tabelle).
+    Die Speicherschätzung stammt aus estimate_memory_usage, die Laufzeit wird auf einem Probeausschnitt gemessen
+    und mit (N / N_Probe) ** TIME_EXPONENT hochgerechnet (verteilte Analyse: linear, Koordinator-Speicher gemessen);
+    beides sind grobe Richtwerte. Nicht kalibrierte Strategien stehen mit Zeit None in der Tabelle.
+    Die Planung zählt zum Zeitbudget: Kalibriert wird nur innerhalb von PLANNING_SHARE des Budgets und nur mit
+    bereits kompilierten Kerneln, sonst wird die exakte Laufzeit grob aus dem Kandidaten-Scan geschätzt (ohne
+    JIT-Zeit). Verglichen wird mit dem nach der Planung verbleibenden Budget.
+    :param source: 2D-Array oder Pfad zu einem GeoTIFF
+    :param time_budget: maximale Laufzeit in Sekunden inklusive Planung (None = unbegrenzt)
+    :param memory_budget: maximaler Speicher in Bytes (None = verfügbarer physischer Speicher)
+    :param tile_size: Tile-Kantenlänge der verteilten Strategien
+    :param max_workers: Anzahl Worker-Prozesse der parallelen Strategie (Standard: Anzahl CPUs)
+    :return: Dict mit strategy, estimates {Strategie: (Sekunden, Bytes, passt)}, reason, planning_time, jit_pending
+             (Kernel noch nicht kompiliert) und den Kenngrößen des DEMs
+    """
+    planning_start = time.perf_counter()
+    deadline = planning_start + PLANNING_SHARE * time_budget if time_budget is not None else None
+    if isinstance(source, str):
+        shape, dtype = read_dem_shape(source)
+    else:
+        shape, dtype = source.shape, source.dtype
+    n_pixels = int(np.prod(shape))
+    dem_bytes = n_pixels * np.dtype(dtype).itemsize
+    workers = max_workers or os.cpu_count() or 1
+    sample = _sample(source, shape)
+
+    available = available_memory()
+    limits = [m for m in (memory_budget, available) if m is not None]
+    memory_limit = min(limits) if limits else None
+
+    if sample.size == n_pixels:
+        # Das DEM passt ganz in den Probeausschnitt: die Kalibrierung würde es selbst mehrfach analysieren
+        with contextlib.redirect_stdout(io.StringIO()):
+            n_candidates = len(find_peak_candidates(sample.copy(), border_width)[0])
+        in_memory = dem_bytes + estimate_memory_usage(shape, dtype, n_candidates)["peak"]
+        if memory_limit is None or in_memory <= memory_limit:
+            return {
+                "strategy": "exakt",
+                "reason": "DEM passt in den Probeausschnitt, exakte Analyse ohne Kalibrierung",
+                "estimates": {"exakt": (None, in_memory, True)},
+                "shape": shape,
+                "dtype": np.dtype(dtype).name,
+                "candidates": n_candidates,
+                "memory_limit": memory_limit,
+                "time_budget": time_budget,
+                "jit_time": None,
+                "planning_time": time.perf_counter() - planning_start,
+        "jit_pending": not _kernels_compiled(dtype),
+                "tile_size": tile_size,
+                "workers": workers,
+            }
+
+    params = dict(prominence_threshold_val=prominence_threshold_val, dominance_threshold_val=dominance_threshold_val,
+                  orographic_dominence_threshold_val=orographic_dominence_threshold_val,
+                  border_width=_sample_border(border_width, shape, sample.shape), min_height=min_height)
+    calibration = _calibrate(sample, params, deadline)
+    scale = n_pixels / sample.size
+    n_candidates = int(calibration["candidates"] * scale)
+    calibrated = calibration["exact_time"] is not None
+    if calibrated:
+        exact_time = calibration["exact_time"] * scale ** TIME_EXPONENT
+        approx_time = calibration["approx_time"] * scale ** TIME_EXPONENT
+    else:
+        # Kalibrierung passt nicht ins Zeitbudget: grobe Schätzung aus dem Kandidaten-Scan der Probe
+        exact_time = calibration["scan_time"] / SCAN_SHARE * scale ** TIME_EXPONENT
+        approx_time = None
+    in_memory = dem_bytes + estimate_memory_usage(shape, dtype, n_candidates)["peak"]
+    estimates = {
+        "exakt": (exact_time, in_memory),
+        "approximativ": (approx_time, in_memory),
+        "anytime": (time_budget if time_budget is not None else exact_time, in_memory),
+    }
+
+    def remaining_budget():
+        return time_budget - (time.perf_counter() - planning_start) if time_budget is not None else None
+
+    def fits(strategy, remaining):
+        seconds, memory = estimates[strategy]
+        if seconds is None:
+            return False
+        return ((memory_limit is None or memory <= memory_limit)
+                and (remaining is None or 0 < remaining and seconds <= remaining))
+
+    # Die verteilten Strategien werden nur kalibriert, wenn sie gewinnen können (mehrere CPUs oder die
+    # exakte Analyse im Speicher hält die Budgets nicht ein), die erste Kalibrierung kostet einige JIT-Sekunden.
+    # Mit Zeitbudget nur, wenn die Kernel kompiliert sind und Vorlauf plus Messlauf (etwa zwei exakte Probeläufe)
+    # noch in den Planungsanteil passen
+    sharded_affordable = deadline is None or (
+        calibrated and bool(_reduced_saddle_tree.signatures) and bool(_answer_bottleneck_queries.signatures)
+        and time.perf_counter() + 2 * calibration["exact_time"] <= deadline)
+    if (workers > 1 or not fits("exakt", remaining_budget())) and sharded_affordable:
+        sharded = _calibrate_sharded(sample, params, tile_size)
+        # Tiles werden unabhängig analysiert, der Koordinator arbeitet auf dem reduzierten Graphen: etwa linear in N
+        sharded_time = sharded["sharded_time"] * scale
+        coordinator = int(sharded["coordinator_memory"] * scale)
+        per_worker = _tile_memory(tile_size, shape, dtype, n_candidates)
+        source_bytes = 0 if isinstance(source, str) else dem_bytes
+        estimates["kachelweise"] = (sharded_time, source_bytes + per_worker + coordinator)
+        if workers > 1:
+            estimates["parallel"] = (sharded_time * SHARDED_OVERHEAD / workers,
+                                     source_bytes + workers * per_worker + coordinator)
+    else:
+        estimates["kachelweise"] = (None, None)
+
+    remaining = remaining_budget()
+    if remaining is not None:
+        # Anytime bekommt das nach der Planung verbleibende Budget
+        estimates["anytime"] = (max(remaining, 0.0), in_memory)
+    table = {name: (seconds, memory, fits(name, remaining)) for name, (seconds, memory) in estimates.items()}
+    exact_candidates = [name for name in EXACT_STRATEGIES if name in table and table[name][2]]
+    if exact_candidates:
+        strategy = min(exact_candidates, key=lambda name: table[name][0])
+        reason = "schnellste exakte Strategie innerhalb der Budgets"
+    elif table["approximativ"][2]:
+        strategy = "approximativ"
+        reason = "keine exakte Strategie hält die Budgets ein, Prominenz per Bresenham-Approximation"
+    elif table["anytime"][2] and time_budget is not None:
+        strategy = "anytime"
+        reason = "nur die Anytime-Analyse hält das Zeitbudget ein, ein Teil der Werte bleibt geschätzt"
+    else:
+        strategy = None
+        reason = "kein Plan hält die Budgets ein"
+    if not calibrated:
+        reason += "; Kalibrierung übersprungen, exakte Laufzeit aus dem Kandidaten-Scan geschätzt"
+
+    return {
+        "strategy": strategy,
+        "reason": reason,
+        "estimates": table,
+        "shape": shape,
+        "dtype": np.dtype(dtype).name,
+        "candidates": n_candidates,
+        "memory_limit": memory_limit,
+        "time_budget": time_budget,
+        "jit_time": calibration["jit_time"],
+        "planning_time": time.perf_counter() - planning_start,
+        "jit_pending": not _kernels_compiled(dtype),
+        "tile_size": tile_size,
+        "workers": workers,
+    }
+
+
+def format_plan(plan):
+    """Gibt den Plan als lesbare Tabelle zurück (Strategie, geschätzte Zeit und Speicher, ob sie die Budgets einhält)."""
+    rows, cols = plan["shape"]
+    limit = f"{plan['memory_limit'] / 1e6:.0f} MB" if plan["memory_limit"] is not None else "unbekannt"
+    budget = f"{plan['time_budget']:.1f} s" if plan["time_budget"] is not None else "unbegrenzt"
+    def fmt(value, unit_scale, width):
+        return f"{value / unit_scale:{width}.2f}" if value is not None else f"{'-':>{width}s}"
+
+    lines = [f"Ausführungsplan für {rows}x{cols} {plan['dtype']} (~{plan['candidates']} Kandidaten, "
+             f"Speichergrenze {limit}, Zeitbudget {budget}, Planung {plan['planning_time']:.2f} s):",
+             f"  {'Strategie':14s}{'Zeit (s)':>10s}{'Speicher (MB)':>16s}  passt"]
+    for name, (seconds, memory, fits) in plan["estimates"].items():
+        marker = " <-" if name == plan["strategy"] else ""
+        verdict = "ja" if fits else "-" if seconds is None else "nein"
+        lines.append(f"  {name:14s}{fmt(seconds, 1, 10)}{fmt(memory, 1e6, 16)}  {verdict}{marker}")
+    lines.append(f"  gewählt: {plan['strategy'] or 'keine'} ({plan['reason']})")
+    if plan["jit_pending"]:
+        lines.append("  Hinweis: numba-Kernel noch nicht kompiliert, der Lauf braucht zusätzlich einige Sekunden JIT-Zeit")
+    return "\n".join(lines)
+
+
+def find_peaks_planned(source, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0,
+                       border_width=50, min_height=0, time_budget=None, memory_budget=None, tile_size=512, max_workers=None):
+    """
+    Plant die Ausführung mit plan_execution, führt die gewählte Strategie aus und protokolliert die Schätzungen
+    neben den tatsächlichen Werten. Der Speicher wird mit tracemalloc gemessen (numpy-Allokationen im
+    Hauptprozess; Worker-Prozesse der verteilten Strategien sind nicht enthalten).
+    Parameter wie find_peaks bzw. plan_execution; die Zeit für Planung und Einlesen wird vom Zeitbudget abgezogen.
+    :raises MemoryError: wenn kein Plan die Budgets einhält (größeres memory_budget oder kleineres tile_size wählen)
+    :return: (peaks, plan) - peaks im Format der gewählten Funktion, plan ergänzt um actual_time und actual_memory
+    """
+    planning_start = time.perf_counter()
+    plan = plan_execution(source, prominence_threshold_val, dominance_threshold_val, orographic_dominence_threshold_val,
+                          border_width, min_height, time_budget, memory_budget, tile_size, max_workers)
+    print(format_plan(plan))
+    if plan["strategy"] is None:
+        smallest = min(memory for _, memory, _ in plan["estimates"].values() if memory is not None)
+        raise MemoryError(f"Kein Ausführungsplan hält die Budgets ein (kleinster geschätzter Speicherbedarf "
+                          f"{smallest / 1e6:.1f} MB, Speichergrenze {plan['memory_limit'] / 1e6:.1f} MB)")
+
+    params = dict(prominence_threshold_val=prominence_threshold_val, dominance_threshold_val=dominance_threshold_val,
+                  orographic_dominence_threshold_val=orographic_dominence_threshold_val, border_width=border_width,
+                  min_height=min_height)
+    strategy = plan["strategy"]
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if strategy in ("parallel", "kachelweise"):
+        peaks = find_peaks_sharded(source, tile_size=tile_size,
+                                   max_workers=plan["workers"] if strategy == "parallel" else 1, **params)
+    else:
+        dem_data = read_dem_fast(source)[0] if isinstance(source, str) else source
+        if strategy == "exakt":
+            peaks = find_peaks(dem_data, **params)
+        elif strategy == "approximativ":
+            peaks = find_peaks(dem_data, use_dijkstra=False, **params)
+        else:
+            remaining = max(time_budget - (time.perf_counter() - planning_start), 0.0)
+            peaks = find_peaks_anytime(dem_data, time_budget=remaining, **params)
+    plan["actual_time"] = time.perf_counter() - start_time
+    plan["actual_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    estimated_time, estimated_memory, _ = plan["estimates"][strategy]
+    estimated = f"geschätzt {estimated_time:.2f} s" if estimated_time is not None else "nicht geschätzt"
+    print(f"Ist-Werte ({strategy}): Zeit {plan['actual_time']:.2f} s ({estimated}), "
+          f"Speicher {plan['actual_memory'] / 1e6:.1f} MB (geschätzt {estimated_memory / 1e6:.1f} MB), "
+          f"{len(peaks)} Gipfel")
+    return peaks, plan
+
+
+if __name__ == "__main__":
+    import glob
+    from peak_analysis import make_test_dem
+
+    test_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data")
+    for dem_path in sorted(glob.glob(os.path.join(test_data, "*.tif"))):
+        print(f"\n--- {os.path.basename(dem_path)} ---")
+        find_peaks_planned(dem_path, prominence_threshold_val=100, dominance_threshold_val=60)
+
+    # Kleines DEM (passt in den Probeausschnitt): keine Kalibrierung
+    print("\n--- Künstliches DEM 500x500 ---")
+    find_peaks_planned(make_test_dem(500, 40, sigma_range=(8, 40)), prominence_threshold_val=100, dominance_threshold_val=20)
+
+    # Knappe Budgets erzwingen andere Strategien
+    dem_path = os.path.join(test_data, "Bhutan.tif")
+    print("\n--- Bhutan.tif, Speichergrenze 20 MB ---")
+    find_peaks_planned(dem_path, prominence_threshold_val=100, dominance_threshold_val=60, memory_budget=20e6, tile_size=256)
+    print("\n--- Bhutan.tif, Speichergrenze 5 MB ---")
+    try:
+        find_peaks_planned(dem_path, prominence_threshold_val=100, dominance_threshold_val=60, memory_budget=5e6, tile_size=256)
+    except MemoryError as e:
+        print(f"Abgebrochen: {e}")
+    print("\n--- Bhutan.tif, Zeitbudget 5 s ---")
+    find_peaks_planned(dem_path, prominence_threshold_val=30, dominance_threshold_val=30, time_budget=5)
+    print("\n--- Bhutan.tif, Zeitbudget 0.2 s (zu knapp für die Kalibrierung) ---")
+    find_peaks_planned(dem_path, prominence_threshold_val=30, dominance_threshold_val=30, time_budget=0.2)
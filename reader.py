@@ -1,4 +1,10 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import rasterio
+from rasterio.windows import Window
 
 def read_dem(file_path):
     """
@@ -13,4 +19,115 @@ def read_dem(file_path):
         crs = src.crs
         transform = src.transform
         xres, yres = src.res
-    return dem_data, crs, transform, (xres, yres)
\ No newline at end of file
+    return dem_data, crs, transform, (xres, yres)
+
+
+def read_dem_fast(file_path, max_workers=None):
+    """
+    Wie read_dem, dekodiert aber die internen Blöcke (Tiles) gekachelter GeoTIFFs parallel in einem Thread-Pool
+    direkt in ein vorab angelegtes Array. Jeder Thread öffnet ein eigenes Dataset-Handle (GDAL-Handles sind nicht
+    threadsicher); rasterio gibt das GIL während des Dekodierens frei.
+    Gestreifte oder einblockige Dateien werden wie in read_dem in einem Stück gelesen; sind sie komprimiert,
+    dekodiert GDAL dabei selbst mit GDAL_NUM_THREADS Threads (sofern die GDAL-Version das unterstützt).
+    :param file_path: Pfad zum GeoTIFF
+    :param max_workers: Anzahl Threads (Standard: Anzahl CPUs)
+    :return: wie read_dem
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    with rasterio.open(file_path) as src:
+        crs = src.crs
+        transform = src.transform
+        xres, yres = src.res
+        rows, cols = src.height, src.width
+        dtype = src.dtypes[0]
+        block_rows, block_cols = src.block_shapes[0]
+        compressed = src.compression is not None
+
+    # Gestreift (Blöcke über die volle Breite), nur ein Block oder nur ein Thread: kein eigener Pool
+    if block_cols >= cols or block_rows >= rows or max_workers == 1:
+        # Unkomprimierte Dateien sind I/O-gebunden, dort bringen Dekodier-Threads nur Overhead
+        with rasterio.Env(GDAL_NUM_THREADS=str(max_workers if compressed else 1)):
+            with rasterio.open(file_path) as src:
+                dem_data = src.read(1)
+        return dem_data, crs, transform, (xres, yres)
+
+    dem_data = np.empty((rows, cols), dtype=dtype)
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def read_block(block):
+        row_off, col_off = block
+        src = getattr(local, "src", None)
+        if src is None:
+            src = local.src = rasterio.open(file_path)
+            with handles_lock:
+                handles.append(src)
+        height = min(block_rows, rows - row_off)
+        width = min(block_cols, cols - col_off)
+        dem_data[row_off:row_off + height, col_off:col_off + width] = src.read(1, window=Window(col_off, row_off, width, height))
+
+    blocks = [(r, c) for r in range(0, rows, block_rows) for c in range(0, cols, block_cols)]
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(read_block, blocks))
+    finally:
+        for src in handles:
+            src.close()
+    return dem_data, crs, transform, (xres, yres)
+
+
+def read_dem_window(file_path, row_off, col_off, height, width):
+    """
+    Liest nur einen rechteckigen Ausschnitt (Window) des ersten Bands.
+    Wird von den Tile-Workern der verteilten Analyse genutzt, damit kein Prozess das ganze DEM lädt.
+    """
+    with rasterio.open(file_path) as src:
+        return src.read(1, window=Window(col_off, row_off, width, height))
+
+
+def read_dem_shape(file_path):
+    """Gibt (rows, cols) und den Datentyp des ersten Bands zurück, ohne Pixeldaten zu lesen."""
+    with rasterio.open(file_path) as src:
+        return (src.height, src.width), src.dtypes[0]
+
+
+if __name__ == "__main__":
+    import glob
+    import tempfile
+    import time
+
+    def benchmark(path, repeats=3):
+        """Durchsatz (MB/s, bester von repeats Läufen) von read_dem und read_dem_fast, Ergebnisse müssen gleich sein."""
+        results = {}
+        for name, reader in (("read_dem", read_dem), ("read_dem_fast", read_dem_fast),
+                             ("4 Threads", lambda p: read_dem_fast(p, max_workers=4))):
+            best = np.inf
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                data = reader(path)[0]
+                best = min(best, time.perf_counter() - start_time)
+            results[name] = data
+            print(f"  {name:15s}{data.nbytes / 1e6 / best:8.1f} MB/s ({best * 1000:.1f} ms)")
+        assert all(np.array_equal(results["read_dem"], data) for data in results.values()), "read_dem_fast weicht von read_dem ab"
+
+    print(f"--- Ladedurchsatz auf test-data ({os.cpu_count()} CPUs) ---")
+    for dem_path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data", "*.tif"))):
+        with rasterio.open(dem_path) as src:
+            layout = f"{src.block_shapes[0][0]}x{src.block_shapes[0][1]}-Blöcke, {src.compression.name if src.compression else 'unkomprimiert'}"
+        print(f"{os.path.basename(dem_path)} ({layout})")
+        benchmark(dem_path)
+
+    # Großes synthetisches, intern gekacheltes und LZW-komprimiertes GeoTIFF
+    size = 6144
+    print(f"\n--- Ladedurchsatz auf synthetischem GeoTIFF ({size}x{size}, float32, 256x256-Tiles, LZW) ---")
+    rng = np.random.default_rng(0)
+    synthetic = np.cumsum(np.cumsum(rng.normal(0, 1, (size, size)).astype(np.float32), axis=0), axis=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "synthetic_tiled.tif")
+        with rasterio.open(synthetic_path, "w", driver="GTiff", height=size, width=size, count=1, dtype="float32",
+                           crs="EPSG:32632", transform=rasterio.transform.from_origin(400000, 5300000, 10, 10),
+                           tiled=True, blockxsize=256, blockysize=256, compress="lzw") as dst:
+            dst.write(synthetic, 1)
+        del synthetic
+        benchmark(synthetic_path)
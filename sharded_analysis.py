@@ -0,0 +1,536 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numba import njit
+from scipy.ndimage import maximum_filter
+from skimage.draw import line
+
+from peak_analysis import compute_nearest_higher, calculate_orographic_dominance, plateau_representatives, _height_dtype
+from reader import read_dem_window, read_dem_shape
+
+# Halo für den 7x7-Maximumfilter in find_local_maxima
+FILTER_HALO = 3
+
+
+# --- Tile-Worker -------------------------------------------------------------------------------
+
+def _load_tile(task, halo=0):
+    """
+    Lädt den Kern eines Tiles (plus optional einen Halo) und nullt die globalen Ränder wie
+    set_image_borders_to_zero. Gibt (Daten, row0, col0) der geladenen Fläche zurück.
+    """
+    rows, cols = task["shape"]
+    r0, r1 = max(task["row0"] - halo, 0), min(task["row1"] + halo, rows)
+    c0, c1 = max(task["col0"] - halo, 0), min(task["col1"] + halo, cols)
+
+    source = task["source"]
+    if isinstance(source, str):
+        data = read_dem_window(source, r0, c0, r1 - r0, c1 - c0)
+    else:
+        # Vom Koordinator bereits zugeschnitten (Halo-Fläche)
+        sr0, sc0 = task["source_offset"]
+        data = np.array(source[r0 - sr0:r1 - sr0, c0 - sc0:c1 - sc0])
+
+    width = task["border_width"]
+    data[:max(width - r0, 0), :] = 0
+    data[max(rows - width - r0, 0):, :] = 0
+    data[:, :max(width - c0, 0)] = 0
+    data[:, max(cols - width - c0, 0):] = 0
+    return data, r0, c0
+
+
+@njit
+def _find(parent, i):
+    """Union-Find mit Pfadkompression."""
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        nxt = parent[i]
+        parent[i] = root
+        i = nxt
+    return root
+
+
+@njit
+def _reduced_saddle_tree(edge_u, edge_v, edge_w, order, is_terminal):
+    """
+    Kruskal über die Pixelkanten eines Tiles in absteigender Sattelhöhe (maximaler Spannbaum).
+    Sobald zwei Komponenten mit Terminal-Pixeln verschmelzen, wird eine Kante zwischen ihren
+    Repräsentanten ausgegeben. Der entstehende Baum über den Terminals hat für jedes Paar
+    denselben Maximin-Sattel wie das Tile selbst.
+    """
+    n = is_terminal.size
+    parent = np.arange(n, dtype=np.int32)
+    size = np.ones(n, dtype=np.int32)
+    rep = np.full(n, -1, dtype=np.int32)
+    for i in range(n):
+        if is_terminal[i]:
+            rep[i] = i
+
+    out_u = np.empty(n, dtype=np.int32)
+    out_v = np.empty(n, dtype=np.int32)
+    out_w = np.empty(n, dtype=np.float64)
+    k = 0
+    for e in order:
+        a = _find(parent, edge_u[e])
+        b = _find(parent, edge_v[e])
+        if a == b:
+            continue
+        if rep[a] >= 0 and rep[b] >= 0:
+            out_u[k] = rep[a]
+            out_v[k] = rep[b]
+            out_w[k] = edge_w[e]
+            k += 1
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        if rep[a] < 0:
+            rep[a] = rep[b]
+    return out_u[:k], out_v[:k], out_w[:k]
+
+
+def analyse_tile(task):
+    """
+    Worker für ein einzelnes Tile. Gibt eine kompakte Zusammenfassung zurück:
+      - candidates / candidate_heights: lokale Maxima (globale Flat-Indizes) wie find_local_maxima
+      - n_min_candidates: Anzahl lokaler Maxima auf dem Tile-Minimum, die weggelassen wurden (außer mit keep_min)
+      - boundary / boundary_heights: Randpixel des Tiles
+      - tree_u / tree_v / tree_w: reduzierter Sattel-Baum über Randpixel und Kandidaten
+      - min / max: kleinste und größte Höhe im Tile
+    """
+    rows, cols = task["shape"]
+    data, hr0, hc0 = _load_tile(task, halo=FILTER_HALO)
+    r0, c0 = task["row0"], task["col0"]
+    core = np.ascontiguousarray(data[r0 - hr0:task["row1"] - hr0, c0 - hc0:task["col1"] - hc0])
+    tile_rows, tile_cols = core.shape
+
+    # Lokale Maxima (der Halo sorgt dafür, dass der Filter im Kern exakt wie auf der ganzen Karte arbeitet)
+    local_max = (maximum_filter(data, size=7) == data)[r0 - hr0:r0 - hr0 + tile_rows, c0 - hc0:c0 - hc0 + tile_cols]
+    # Das genullte Randband ist nie Kandidat (wie in find_peak_candidates). Pixel auf dem Tile-Minimum verwirft der
+    # Koordinator, sobald es das Minimum der ganzen Karte ist; ohne keep_min werden sie nur gezählt. Beides sind
+    # sonst ganze Flächen von Kandidaten und Terminals.
+    width = task["border_width"]
+    local_max[:max(width - r0, 0), :] = False
+    local_max[max(rows - width - r0, 0):, :] = False
+    local_max[:, :max(width - c0, 0)] = False
+    local_max[:, max(cols - width - c0, 0):] = False
+    at_min = local_max & (core == core.min())
+    if not task.get("keep_min"):
+        local_max &= ~at_min
+    cand_r, cand_c = np.nonzero(local_max)
+
+    # Randpixel des Tiles
+    border = np.zeros(core.shape, dtype=bool)
+    border[[0, -1], :] = True
+    border[:, [0, -1]] = True
+    bound_r, bound_c = np.nonzero(border)
+
+    # Kanten zwischen 4-Nachbarn, Gewicht = niedrigere der beiden Höhen
+    index = np.arange(core.size, dtype=np.int32).reshape(core.shape)
+    edge_u = np.concatenate([index[:, :-1].ravel(), index[:-1, :].ravel()])
+    edge_v = np.concatenate([index[:, 1:].ravel(), index[1:, :].ravel()])
+    edge_w = np.concatenate([np.minimum(core[:, :-1], core[:, 1:]).ravel(),
+                             np.minimum(core[:-1, :], core[1:, :]).ravel()])
+    order = np.argsort(edge_w, kind="stable")[::-1]
+    is_terminal = border.ravel() | local_max.ravel()
+    tree_u, tree_v, tree_w = _reduced_saddle_tree(edge_u, edge_v, edge_w, order, is_terminal)
+
+    def to_global(local_flat):
+        return (local_flat // tile_cols + r0).astype(np.int64) * cols + (local_flat % tile_cols + c0)
+
+    return {
+        "candidates": (cand_r + r0).astype(np.int64) * cols + (cand_c + c0),
+        "candidate_heights": core[cand_r, cand_c],
+        "n_min_candidates": 0 if task.get("keep_min") else int(np.count_nonzero(at_min)),
+        "boundary": (bound_r + r0).astype(np.int64) * cols + (bound_c + c0),
+        "boundary_heights": core[bound_r, bound_c],
+        "tree_u": to_global(tree_u),
+        "tree_v": to_global(tree_v),
+        "tree_w": tree_w,
+        "min": core.min(),
+        "max": core.max(),
+    }
+
+
+def _nearest_at_least(core, r0, c0, x, y, h0, initial_radius=64):
+    """
+    Abstand von (x, y) zum nächsten Pixel des Tiles mit Höhe >= h0 (ohne (x, y) selbst), sonst inf.
+    Gesucht wird wie in calculate_dominance_distance in einem wachsenden Fenster um (x, y) statt im ganzen Tile;
+    (x, y) darf außerhalb des Tiles liegen.
+    """
+    rows, cols = core.shape
+    ly, lx = y - r0, x - c0
+    radius = initial_radius
+    while True:
+        y0, y1 = max(ly - radius, 0), min(ly + radius + 1, rows)
+        x0, x1 = max(lx - radius, 0), min(lx + radius + 1, cols)
+        covers_tile = y0 == 0 and x0 == 0 and y1 == rows and x1 == cols
+        if y0 < y1 and x0 < x1:
+            ys, xs = np.nonzero(core[y0:y1, x0:x1] >= h0)
+            dy = (ys + y0 - ly).astype(np.int64)
+            dx = (xs + x0 - lx).astype(np.int64)
+            d2 = dy * dy + dx * dx
+            d2 = d2[d2 > 0]
+            # Pixel außerhalb des Fensters sind weiter als radius entfernt
+            if d2.size and (covers_tile or d2.min() <= radius * radius):
+                return np.sqrt(np.float64(d2.min()))
+        if covers_tile:
+            return np.inf
+        radius *= 4
+
+
+def query_tile(task):
+    """
+    Worker für Rückfragen des Koordinators an ein Tile:
+      - lines: (query_ids, rows, cols) -> Minimum der Höhen entlang der Bresenham-Linien je Query
+      - dominance: (query_ids, xs, ys, heights) -> Abstand zum nächsten Pixel >= Höhe je Query
+    """
+    core, r0, c0 = _load_tile(task)
+    result = {}
+
+    if "lines" in task:
+        query_ids, rr, cc = task["lines"]
+        values = core[rr - r0, cc - c0]
+        starts = np.flatnonzero(np.r_[True, query_ids[1:] != query_ids[:-1]])
+        result["lines"] = (query_ids[starts], np.minimum.reduceat(values, starts))
+
+    if "dominance" in task:
+        query_ids, xs, ys, heights = task["dominance"]
+        distances = np.array([_nearest_at_least(core, r0, c0, x, y, h) for x, y, h in zip(xs, ys, heights)],
+                             dtype=np.float64)
+        result["dominance"] = (query_ids, distances)
+    return result
+
+
+# --- Koordinator -------------------------------------------------------------------------------
+
+@njit
+def _answer_bottleneck_queries(n_nodes, edge_u, edge_v, edge_w, order, query_a, query_b):
+    """
+    Kruskal auf dem zusammengeführten Sattel-Graphen in absteigender Sattelhöhe. Die Query-Endpunkte
+    hängen als verkettete Listen an ihren Komponenten; beim Verschmelzen wird nur die kürzere Liste
+    geprüft (small-to-large). Der Sattel einer Query ist das Gewicht der Kante, die ihre Endpunkte verbindet.
+    """
+    n_queries = query_a.size
+    answer = np.full(n_queries, -np.inf)
+    parent = np.arange(n_nodes, dtype=np.int64)
+    head = np.full(n_nodes, -1, dtype=np.int64)
+    tail = np.full(n_nodes, -1, dtype=np.int64)
+    count = np.zeros(n_nodes, dtype=np.int64)
+    nxt = np.full(2 * n_queries, -1, dtype=np.int64)
+    entry_query = np.empty(2 * n_queries, dtype=np.int64)
+    entry_other = np.empty(2 * n_queries, dtype=np.int64)
+
+    for q in range(n_queries):
+        for side in range(2):
+            e = 2 * q + side
+            node = query_a[q] if side == 0 else query_b[q]
+            entry_query[e] = q
+            entry_other[e] = query_b[q] if side == 0 else query_a[q]
+            nxt[e] = head[node]
+            head[node] = e
+            if tail[node] < 0:
+                tail[node] = e
+            count[node] += 1
+
+    remaining = n_queries
+    for k in order:
+        if remaining == 0:
+            break
+        a = _find(parent, edge_u[k])
+        b = _find(parent, edge_v[k])
+        if a == b:
+            continue
+        if count[a] < count[b]:
+            a, b = b, a
+        e = head[b]
+        while e >= 0:
+            q = entry_query[e]
+            if answer[q] == -np.inf and _find(parent, entry_other[e]) == a:
+                answer[q] = edge_w[k]
+                remaining -= 1
+            e = nxt[e]
+        if head[b] >= 0:
+            if head[a] < 0:
+                head[a] = head[b]
+            else:
+                nxt[tail[a]] = head[b]
+            tail[a] = tail[b]
+            count[a] += count[b]
+        parent[b] = a
+    return answer
+
+
+def _make_tasks(source, tile_size, border_width):
+    """Zerlegt das DEM in ein regelmäßiges Tile-Gitter."""
+    if isinstance(source, str):
+        shape, _ = read_dem_shape(source)
+    else:
+        shape = source.shape
+    rows, cols = shape
+    tasks = []
+    for row0 in range(0, rows, tile_size):
+        for col0 in range(0, cols, tile_size):
+            tasks.append({
+                "source": source,
+                "shape": shape,
+                "row0": row0, "row1": min(row0 + tile_size, rows),
+                "col0": col0, "col1": min(col0 + tile_size, cols),
+                "border_width": border_width,
+            })
+    return tasks, shape
+
+
+def _with_source(task, halo):
+    """Schneidet bei In-Memory-DEMs nur die benötigte Fläche aus, damit nicht das ganze Array an jeden Worker geht."""
+    source = task["source"]
+    if isinstance(source, str):
+        return task
+    rows, cols = task["shape"]
+    r0, c0 = max(task["row0"] - halo, 0), max(task["col0"] - halo, 0)
+    r1, c1 = min(task["row1"] + halo, rows), min(task["col1"] + halo, cols)
+    return dict(task, source=source[r0:r1, c0:c1], source_offset=(r0, c0))
+
+
+def _cross_tile_edges(boundary, boundary_heights, cols):
+    """Kanten zwischen benachbarten Randpixeln (auch über Tile-Grenzen hinweg)."""
+    order = np.argsort(boundary)
+    boundary, boundary_heights = boundary[order], boundary_heights[order]
+    edges_u, edges_v, edges_w = [], [], []
+    for step, valid in ((1, boundary % cols + 1 < cols), (cols, np.ones(boundary.size, dtype=bool))):
+        neighbour = boundary + step
+        pos = np.clip(np.searchsorted(boundary, neighbour), 0, boundary.size - 1)
+        hit = valid & (boundary[pos] == neighbour)
+        edges_u.append(boundary[hit])
+        edges_v.append(neighbour[hit])
+        edges_w.append(np.minimum(boundary_heights[hit], boundary_heights[pos[hit]]).astype(np.float64))
+    return np.concatenate(edges_u), np.concatenate(edges_v), np.concatenate(edges_w)
+
+
+def _tile_of(rows_px, cols_px, tile_size, n_tile_cols):
+    return (rows_px // tile_size) * n_tile_cols + cols_px // tile_size
+
+
+def find_peaks_sharded(source, prominence_threshold_val=500, dominance_threshold_val=100, orographic_dominence_threshold_val=0,
+                       border_width=50, min_height=0, tile_size=512, max_workers=None, executor=None):
+    """
+    Verteilte Variante von find_peaks: jedes Tile wird von einem eigenen Worker-Prozess analysiert, der nur
+    eine kompakte Zusammenfassung (lokale Maxima, Randpixel, reduzierter Sattel-Baum) zurückgibt. Der Koordinator
+    verbindet die Sattel-Bäume über die Tile-Grenzen und berechnet daraus exakte Sättel; Bresenham-Vorfilter und
+    Dominanz werden als gezielte Rückfragen an die betroffenen Tiles gestellt.
+    Liefert dieselbe Liste wie find_peaks: [(x, y), Höhe, Prominenz, Dominanz]
+    :param source: 2D-Array oder Pfad zu einem GeoTIFF (dann liest jeder Worker nur sein Window)
+    :param tile_size: Kantenlänge der Tiles in Pixeln
+    :param max_workers: Anzahl lokaler Worker-Prozesse (wenn kein executor übergeben wird)
+    :param executor: beliebiger concurrent.futures-Executor (z.B. für entfernte Worker)
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        return _run_sharded(executor, source, prominence_threshold_val, dominance_threshold_val,
+                            orographic_dominence_threshold_val, border_width, min_height, tile_size)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def _run_sharded(executor, source, prominence_threshold_val, dominance_threshold_val, orographic_dominence_threshold_val,
+                 border_width, min_height, tile_size):
+    start_time = time.time()
+    tasks, (rows, cols) = _make_tasks(source, tile_size, border_width)
+    n_tile_cols = -(-cols // tile_size)
+
+    # --- Runde 1: Zusammenfassungen aller Tiles ---
+    summaries = list(executor.map(analyse_tile, [_with_source(t, FILTER_HALO) for t in tasks]))
+    print(f"{len(tasks)} Tiles analysiert in {time.time() - start_time:.2f} Sekunden")
+
+    # Kandidaten in Rasterreihenfolge wie np.argwhere, Minima der ganzen Karte ausschließen. Tiles, deren Minimum
+    # darüber liegt, werden mit ihren Minimum-Pixeln als Kandidaten neu analysiert.
+    global_min = min(s["min"] for s in summaries)
+    redo = [k for k, s in enumerate(summaries) if s["n_min_candidates"] and s["min"] != global_min]
+    if redo:
+        redo_tasks = [dict(_with_source(tasks[k], FILTER_HALO), keep_min=True) for k in redo]
+        for k, summary in zip(redo, executor.map(analyse_tile, redo_tasks)):
+            summaries[k] = summary
+        print(f"{len(redo)} Tiles mit Maxima auf ihrem Minimum neu analysiert")
+    candidates = np.concatenate([s["candidates"] for s in summaries])
+    candidate_heights = np.concatenate([s["candidate_heights"] for s in summaries])
+    keep = candidate_heights != global_min
+    candidates, candidate_heights = candidates[keep], candidate_heights[keep]
+    order = np.argsort(candidates)
+    candidates, candidate_heights = candidates[order], candidate_heights[order]
+    # Plateaus wie in find_peak_candidates zusammenfassen (Plateaus über Tile-Grenzen hinweg eingeschlossen);
+    # die übrigen Plateau-Pixel bleiben Ziel der Nearest-Higher-Suche
+    representative = np.zeros(len(candidates), dtype=bool)
+    representative[plateau_representatives(np.column_stack([candidates // cols, candidates % cols]), (rows, cols))] = True
+    n_collapsed = len(candidates) - int(np.count_nonzero(representative))
+    print(f"Anzahl gefundener lokaler Maxima (und nach Randfilter): {len(candidates) - n_collapsed}"
+          + (f" ({n_collapsed} Plateau-Pixel zusammengefasst)" if n_collapsed else ""))
+    if not candidates.size:
+        return []
+
+    # Sortierung und Nearest-Higher exakt wie calculate_prominent_peaks
+    coords = np.column_stack([candidates % cols, candidates // cols]).astype(np.int32)
+    heights = candidate_heights.astype(_height_dtype(candidate_heights.dtype))
+    order = np.argsort(-heights, kind="stable")
+    coords, heights, candidates, candidate_heights = coords[order], heights[order], candidates[order], candidate_heights[order]
+    representative = representative[order]
+    nearest = compute_nearest_higher(coords, heights)
+
+    # --- Sattel-Graph aus Tile-Bäumen und Kanten über die Tile-Grenzen ---
+    boundary = np.concatenate([s["boundary"] for s in summaries])
+    boundary_heights = np.concatenate([s["boundary_heights"] for s in summaries])
+    cross_u, cross_v, cross_w = _cross_tile_edges(boundary, boundary_heights, cols)
+    edge_u = np.concatenate([s["tree_u"] for s in summaries] + [cross_u])
+    edge_v = np.concatenate([s["tree_v"] for s in summaries] + [cross_v])
+    edge_w = np.concatenate([s["tree_w"] for s in summaries] + [cross_w])
+
+    nodes, inverse = np.unique(np.concatenate([edge_u, edge_v, candidates]), return_inverse=True)
+    n_edges = edge_u.size
+    node_u, node_v = inverse[:n_edges], inverse[n_edges:2 * n_edges]
+    node_candidates = inverse[2 * n_edges:]
+
+    has_higher = np.flatnonzero((nearest >= 0) & representative)
+    saddles = np.full(len(candidates), -np.inf)
+    saddles[has_higher] = _answer_bottleneck_queries(
+        nodes.size, node_u, node_v, edge_w, np.argsort(edge_w, kind="stable")[::-1],
+        node_candidates[has_higher], node_candidates[nearest[has_higher]])
+    print(f"Sattel-Graph: {nodes.size} Knoten, {n_edges} Kanten")
+
+    # Exakte Prominenz (wie der Maximin-Dijkstra in calculate_prominent_peaks)
+    prominences = heights.astype(np.float64) - saddles
+    prominences[nearest < 0] = heights[nearest < 0]
+    passed = np.flatnonzero((prominences >= prominence_threshold_val) & representative)
+
+    # --- Runde 2: Bresenham-Vorfilter und Dominanz im eigenen Tile ---
+    line_ids, line_rr, line_cc = [], [], []
+    for i in passed:
+        j = nearest[i]
+        if j < 0:
+            continue
+        rr, cc = line(coords[i, 1], coords[i, 0], coords[j, 1], coords[j, 0])
+        line_ids.append(np.full(rr.size, i, dtype=np.int64))
+        line_rr.append(rr)
+        line_cc.append(cc)
+
+    dominance_ids = np.array([i for i in passed
+                              if int(heights[i]) >= min_height
+                              and calculate_orographic_dominance(int(heights[i]), int(prominences[i])) >= orographic_dominence_threshold_val],
+                             dtype=np.int64)
+
+    round_tasks = {}
+    if line_ids:
+        line_ids, line_rr, line_cc = np.concatenate(line_ids), np.concatenate(line_rr), np.concatenate(line_cc)
+        line_tiles = _tile_of(line_rr, line_cc, tile_size, n_tile_cols)
+        by_tile = np.lexsort((line_ids, line_tiles))
+        line_ids, line_rr, line_cc, line_tiles = line_ids[by_tile], line_rr[by_tile], line_cc[by_tile], line_tiles[by_tile]
+        for t in np.unique(line_tiles):
+            lo, hi = np.searchsorted(line_tiles, [t, t + 1])
+            round_tasks.setdefault(t, {})["lines"] = (line_ids[lo:hi], line_rr[lo:hi], line_cc[lo:hi])
+
+    dom_x, dom_y = coords[dominance_ids, 0], coords[dominance_ids, 1]
+    home_tiles = _tile_of(dom_y, dom_x, tile_size, n_tile_cols)
+    for t in np.unique(home_tiles):
+        sel = home_tiles == t
+        round_tasks.setdefault(t, {})["dominance"] = (dominance_ids[sel], dom_x[sel], dom_y[sel], candidate_heights[dominance_ids[sel]])
+
+    line_min = np.full(len(candidates), np.inf)
+    dominance = np.full(len(candidates), np.inf)
+    tile_ids = list(round_tasks)
+    answers = executor.map(query_tile, [dict(_with_source(tasks[t], 0), **round_tasks[t]) for t in tile_ids])
+    for t, result in zip(tile_ids, answers):
+        if "lines" in result:
+            ids, mins = result["lines"]
+            np.minimum.at(line_min, ids, mins.astype(np.float64))
+        if "dominance" in result:
+            ids, distances = result["dominance"]
+            dominance[ids] = distances
+
+    # --- Runde 3: Dominanz über Tile-Grenzen, nur wo der Abstand im eigenen Tile nicht beweisbar minimal ist ---
+    tile_max = np.array([s["max"] for s in summaries])
+    tile_col0, tile_col1, tile_row0, tile_row1 = (np.array([task[k] for task in tasks]) for k in ("col0", "col1", "row0", "row1"))
+    cross_tasks = {}
+    for i, t in zip(dominance_ids, home_tiles):
+        x, y = coords[i]
+        home = tasks[t]
+        # Pixel außerhalb des eigenen Tiles sind mindestens so weit entfernt wie die nächste innere Tile-Kante
+        margins = []
+        if home["col0"] > 0:
+            margins.append(x - home["col0"] + 1)
+        if home["col1"] < cols:
+            margins.append(home["col1"] - x)
+        if home["row0"] > 0:
+            margins.append(y - home["row0"] + 1)
+        if home["row1"] < rows:
+            margins.append(home["row1"] - y)
+        if dominance[i] <= min(margins, default=np.inf):
+            continue
+        # Abstand zu allen Tiles auf einmal
+        dx = np.maximum(np.maximum(tile_col0 - x, 0), x - (tile_col1 - 1))
+        dy = np.maximum(np.maximum(tile_row0 - y, 0), y - (tile_row1 - 1))
+        reachable = (tile_max >= candidate_heights[i]) & (np.hypot(dx, dy) < dominance[i])
+        reachable[t] = False
+        for u in np.flatnonzero(reachable):
+            cross_tasks.setdefault(int(u), []).append(i)
+
+    tile_ids = list(cross_tasks)
+    queries = [np.array(cross_tasks[u], dtype=np.int64) for u in tile_ids]
+    answers = executor.map(query_tile, [
+        dict(_with_source(tasks[u], 0), dominance=(ids, coords[ids, 0], coords[ids, 1], candidate_heights[ids]))
+        for u, ids in zip(tile_ids, queries)])
+    for result in answers:
+        ids, distances = result["dominance"]
+        np.minimum.at(dominance, ids, distances)
+    print(f"Dominanz-Rückfragen über Tile-Grenzen: {sum(len(q) for q in queries)}")
+
+    # --- Zusammenführen wie in find_peaks ---
+    prominent_peaks_info = []
+    for i in passed:
+        h = int(heights[i])
+        if nearest[i] >= 0 and h - line_min[i] < prominence_threshold_val:
+            continue  # Bresenham-Vorfilter
+        prominent_peaks_info.append((i, (int(coords[i, 0]), int(coords[i, 1])), h, int(prominences[i])))
+    print(f"Anzahl prominenter Gipfel: {len(prominent_peaks_info)}")
+
+    filtered_peaks = []
+    for rank, (i, peak_xy, peak_h, prominence) in enumerate(prominent_peaks_info):
+        if peak_h < min_height:
+            continue
+        if calculate_orographic_dominance(peak_h, prominence) < orographic_dominence_threshold_val:
+            continue
+        # Wie in find_peaks: der höchste prominente Gipfel hat unendliche Dominanz
+        peak_dominance = np.inf if rank == 0 else dominance[i]
+        if peak_dominance >= dominance_threshold_val:
+            filtered_peaks.append((peak_xy, peak_h, prominence, peak_dominance))
+    print(f"Anzahl Gipfel: {len(filtered_peaks)} ({time.time() - start_time:.2f} Sekunden)")
+    return filtered_peaks
+
+
+if __name__ == "__main__":
+    from peak_analysis import find_peaks, make_test_dem
+
+    print("--- Test für find_peaks_sharded ---")
+    test_dem = make_test_dem(900, 80, sigma_range=(8, 60), noise=20)
+
+    start_time = time.time()
+    expected = find_peaks(test_dem.copy(), prominence_threshold_val=100, dominance_threshold_val=20)
+    print(f"Single-Node: {time.time() - start_time:.2f} Sekunden\n")
+    for tile_size in (300, 128):
+        result = find_peaks_sharded(test_dem, prominence_threshold_val=100, dominance_threshold_val=20,
+                                    tile_size=tile_size, max_workers=4)
+        assert result == expected, f"Abweichung bei tile_size={tile_size}"
+        print(f"tile_size={tile_size}: identisch mit find_peaks ({len(result)} Gipfel)\n")
+
+    # Orographische Dominanz > 0 auf echten Testdaten (jeder Worker liest sein Window aus der Datei)
+    import os
+    from reader import read_dem
+
+    valais_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data", "Valais.tif")
+    expected = find_peaks(read_dem(valais_path)[0], 30, 1.5, 3, 50, 0)
+    result = find_peaks_sharded(valais_path, 30, 1.5, 3, 50, 0, tile_size=256, max_workers=4)
+    assert result == expected, "Abweichung bei orographischer Dominanz 3"
+    print(f"Valais mit orographischer Dominanz 3: identisch mit find_peaks ({len(result)} Gipfel)")
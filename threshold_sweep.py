@@ -0,0 +1,162 @@
+import numpy as np
+import time
+
+from peak_analysis import (find_peak_candidates, calculate_prominent_peaks, calculate_dominance_distance,
+                           calculate_orographic_dominance)
+
+
+def compute_peak_attributes(dem_data, min_prominence=0, min_height=0, orographic_dominence_threshold_val=0, border_width=50):
+    """
+    Berechnet Höhe, Prominenz und Dominanz einmalig für alle Kandidaten, die die kleinsten Schwellenwerte
+    eines Sweeps erfüllen. Liefert dieselben Werte wie find_peaks, nur ohne Dominanz-Filter.
+    find_peaks verlangt, dass sowohl die exakte als auch die Bresenham-Prominenz die Schwelle erreichen; maßgeblich
+    für die Prominenz-Schwelle ist deshalb min(exakt, Bresenham), gespeichert als fünftes Element.
+    :param dem_data: 2D-Array der Höhenwerte (DEM-Daten), Ränder werden wie in find_peaks in-place genullt
+    :param min_prominence: kleinste Prominenz-Schwelle des Sweeps
+    :param min_height: kleinste Mindesthöhe des Sweeps
+    :param orographic_dominence_threshold_val: feste Schwelle für die orographische Dominanz
+    :param border_width: Breite des Randes, der ausgeschlossen wird
+    :return: Liste [(x, y), Höhe, Prominenz, Dominanz, Schwellen-Prominenz], absteigend nach Höhe sortiert
+    """
+    candidate_peaks_yx, representative = find_peak_candidates(dem_data, border_width)
+    if not candidate_peaks_yx.size:
+        return []
+
+    candidate_peaks_xy_list = [(c, r) for r, c in candidate_peaks_yx]
+    prominent_peaks_info = calculate_prominent_peaks(candidate_peaks_xy_list, dem_data, min_prominence,
+                                                     representative=representative, line_prominence=True)
+
+    peaks = []
+    sorted_peaks = sorted(prominent_peaks_info, key=lambda p: -p[1])
+    for i, (peak_xy, peak_h, prominence, line_prominence) in enumerate(sorted_peaks):
+        if peak_h < min_height:
+            continue
+        if calculate_orographic_dominance(peak_h, prominence) < orographic_dominence_threshold_val:
+            continue
+        # Wie in find_peaks: nur der höchste Gipfel hat unendliche Dominanz
+        dominance = np.inf if i == 0 else calculate_dominance_distance(peak_xy, dem_data)
+        peaks.append((peak_xy, peak_h, prominence, dominance, min(prominence, line_prominence)))
+    return peaks
+
+
+def count_peaks_grid(peaks, prominence_values, dominance_values, min_height_values=(0,)):
+    """
+    Zählt für jede Kombination der Schwellenwerte, wie viele Gipfel find_peaks liefern würde.
+    Jeder Gipfel wird per searchsorted genau einer Zelle eines 3D-Histogramms zugeordnet; die
+    Anzahl ergibt sich dann als rückwärts kumulierte Summe über alle drei Achsen (O(n + Gittergröße)).
+    :param peaks: Ergebnis von compute_peak_attributes
+    :param prominence_values: aufsteigend sortierte Prominenz-Schwellen (m)
+    :param dominance_values: aufsteigend sortierte Dominanz-Schwellen (Pixel, wie in find_peaks)
+    :param min_height_values: aufsteigend sortierte Mindesthöhen (m)
+    :return: int-Array counts[i_prom, i_dom, i_height]
+    """
+    axes = [np.asarray(v, dtype=np.float64) for v in (prominence_values, dominance_values, min_height_values)]
+    for values in axes:
+        if values.ndim != 1 or values.size == 0 or np.any(np.diff(values) < 0):
+            raise ValueError("Schwellenwerte müssen als nicht-leere, aufsteigend sortierte 1D-Folge übergeben werden")
+
+    shape = tuple(values.size for values in axes)
+    if not peaks:
+        return np.zeros(shape, dtype=np.int64)
+
+    attributes = np.array([(threshold_prom, dom, h) for _, h, _, dom, threshold_prom in peaks], dtype=np.float64)
+
+    # Index der größten Schwelle, die der Gipfel noch erfüllt (-1 = keine)
+    bins = np.empty(attributes.shape, dtype=np.int64)
+    for axis, values in enumerate(axes):
+        bins[:, axis] = np.searchsorted(values, attributes[:, axis], side="right") - 1
+    bins = bins[(bins >= 0).all(axis=1)]
+
+    hist = np.bincount(np.ravel_multi_index(bins.T, shape), minlength=int(np.prod(shape))).reshape(shape)
+    for axis in range(3):
+        hist = np.flip(np.cumsum(np.flip(hist, axis), axis=axis), axis)
+    return hist
+
+
+def select_peaks(peaks, prominence_threshold_val, dominance_threshold_val, min_height=0):
+    """
+    Wählt aus den vorberechneten Attributen die Gipfel für eine einzelne Schwellen-Kombination aus.
+    Gibt dieselbe Liste zurück wie find_peaks mit diesen Parametern.
+    """
+    return [p[:4] for p in peaks
+            if p[4] >= prominence_threshold_val and p[3] >= dominance_threshold_val and p[1] >= min_height]
+
+
+def sweep_thresholds(dem_data, prominence_values, dominance_values, min_height_values=(0,),
+                     orographic_dominence_threshold_val=0, border_width=50):
+    """
+    Threshold-Sweep: berechnet die Gipfel-Attribute einmal (für die kleinsten Schwellen) und
+    zählt dann die Gipfel für das ganze Gitter Prominenz × Dominanz × Mindesthöhe.
+    Exakt für ganzzahlige Prominenz-Schwellen (find_peaks speichert die Prominenz abgerundet).
+    :return: (counts, peaks) - counts siehe count_peaks_grid, peaks für select_peaks
+    """
+    start_time = time.time()
+    peaks = compute_peak_attributes(dem_data,
+                                    min_prominence=np.min(prominence_values),
+                                    min_height=np.min(min_height_values),
+                                    orographic_dominence_threshold_val=orographic_dominence_threshold_val,
+                                    border_width=border_width)
+    counts = count_peaks_grid(peaks, prominence_values, dominance_values, min_height_values)
+    print(f"Sweep über {counts.size} Kombinationen in {time.time() - start_time:.2f} Sekunden")
+    return counts, peaks
+
+
+def format_sweep_table(counts, prominence_values, dominance_values, height_index=0):
+    """
+    Formatiert eine Schicht (feste Mindesthöhe) des Sweeps als Texttabelle:
+    Zeilen = Prominenz, Spalten = Dominanz.
+    """
+    layer = counts[:, :, height_index]
+    header = "Prom \\ Dom".rjust(10) + "".join(f"{d:>8g}" for d in dominance_values)
+    rows = [f"{p:>10g}" + "".join(f"{c:>8d}" for c in layer[i]) for i, p in enumerate(prominence_values)]
+    return "\n".join([header] + rows)
+
+
+def plot_sweep(counts, prominence_values, dominance_values, height_index=0, ax=None):
+    """
+    Zeichnet eine Schicht des Sweeps als Heatmap (Anzahl Gipfel je Prominenz/Dominanz).
+    :return: Axes-Objekt
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        _, ax = plt.subplots()
+    layer = counts[:, :, height_index]
+    mesh = ax.pcolormesh(np.arange(len(dominance_values) + 1), np.arange(len(prominence_values) + 1), layer,
+                         cmap="viridis", shading="flat")
+    ax.set_xticks(np.arange(len(dominance_values)) + 0.5, [f"{d:g}" for d in dominance_values], rotation=90)
+    ax.set_yticks(np.arange(len(prominence_values)) + 0.5, [f"{p:g}" for p in prominence_values])
+    ax.set_xlabel("Dominanz (px)")
+    ax.set_ylabel("Prominenz (m)")
+    ax.figure.colorbar(mesh, ax=ax, label="Anzahl Gipfel")
+    return ax
+
+
+if __name__ == "__main__":
+    from peak_analysis import find_peaks, make_test_dem
+
+    print("--- Test für sweep_thresholds ---")
+    test_dem = make_test_dem(600, 80, sigma_range=(8, 40))
+
+    prominence_values = np.linspace(50, 1000, 50).round()
+    dominance_values = np.linspace(5, 250, 50).round()
+    min_height_values = (0, 500)
+    counts, peaks = sweep_thresholds(test_dem.copy(), prominence_values, dominance_values, min_height_values)
+    print(format_sweep_table(counts[::10, ::10], prominence_values[::10], dominance_values[::10]))
+
+    # Stichprobe gegen find_peaks
+    for p, d, h in ((2, 3, 0), (20, 10, 1), (45, 40, 0)):
+        expected = find_peaks(test_dem.copy(), prominence_values[p], dominance_values[d], 0, 50, min_height_values[h])
+        assert counts[p, d, h] == len(expected) == len(select_peaks(peaks, prominence_values[p], dominance_values[d], min_height_values[h]))
+    print("Stichproben stimmen mit find_peaks überein.")
+
+    # Echte float32-Testdaten: hier weichen Bresenham- und exakte Prominenz voneinander ab
+    import os
+    from reader import read_dem
+
+    valais = read_dem(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-data", "Valais.tif"))[0]
+    counts, peaks = sweep_thresholds(valais.copy(), [100], [1.5])
+    expected = find_peaks(valais.copy(), 100, 1.5, 0, 50, 0)
+    assert counts[0, 0, 0] == len(expected)
+    assert select_peaks(peaks, 100, 1.5) == expected
+    print(f"Valais (Prominenz 100, Dominanz 1.5): {len(expected)} Gipfel wie find_peaks.")